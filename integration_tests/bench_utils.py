@@ -0,0 +1,680 @@
+import base64
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from dateutil.parser import isoparse
+from hexbytes import HexBytes
+from web3.exceptions import TransactionNotFound
+
+# max tx records kept by a tracer, the oldest ones are dropped
+TX_TRACE_SIZE = int(os.getenv("TX_TRACE_SIZE", 10000))
+# interval of polling the pending txs and new blocks
+TX_TRACE_INTERVAL = float(os.getenv("TX_TRACE_INTERVAL", 0.05))
+TX_STAGES = ["ack", "pending", "included", "receipt"]
+PERCENTILES = [50, 95, 99]
+
+
+def percentile(values, p):
+    "linear interpolated percentile of the sorted `values`"
+    if not values:
+        return None
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(values):
+    "count, mean, min, max and percentiles of the samples"
+    values = sorted(v for v in values if v is not None)
+    result = {"count": len(values)}
+    if values:
+        result |= {
+            "mean": sum(values) / len(values),
+            "min": values[0],
+            "max": values[-1],
+        }
+        for p in PERCENTILES:
+            result[f"p{p}"] = percentile(values, p)
+    return result
+
+
+def process_rss(pid):
+    "resident set size of the process in bytes"
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+def process_cpu_time(pid):
+    "user and system cpu seconds consumed by the process"
+    stat = Path(f"/proc/{pid}/stat").read_text()
+    # the fields after the command name, which can contain spaces
+    fields = stat[stat.rindex(")") + 2 :].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def process_io(pid):
+    "bytes read from and written to the storage layer by the process"
+    fields = dict(
+        line.split(": ") for line in Path(f"/proc/{pid}/io").read_text().splitlines()
+    )
+    return int(fields["read_bytes"]), int(fields["write_bytes"])
+
+
+def process_fds(pid):
+    "number of open file descriptors of the process"
+    return len(os.listdir(f"/proc/{pid}/fd"))
+
+
+# seconds between the samples of the node processes, sampling all the tests if set
+RESOURCE_SAMPLE_INTERVAL = os.getenv("RESOURCE_SAMPLE_INTERVAL")
+# samples kept per process, the oldest ones are dropped
+RESOURCE_SAMPLES = 3600
+
+
+class ResourceSampler:
+    """
+    sample the rss, cpu time, open fds and disk io of processes at a fixed
+    interval in a background thread while it's active, keep a bounded time
+    series of `(time, rss, cpu, fds, read_bytes, write_bytes)` per process.
+    """
+
+    def __init__(self, interval=1.0, size=RESOURCE_SAMPLES):
+        self.interval = interval
+        self.pids = {}
+        self.series = {}
+        # the first sample of each process, kept for the totals
+        self.first = {}
+        self.size = size
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, pids):
+        "add processes to sample, as a dict of name to pid"
+        with self._lock:
+            self.pids.update(pids)
+
+    def sample(self):
+        now = time.time()
+        with self._lock:
+            pids = dict(self.pids)
+        for name, pid in pids.items():
+            try:
+                point = (
+                    now,
+                    process_rss(pid) or 0,
+                    process_cpu_time(pid),
+                    process_fds(pid),
+                    *process_io(pid),
+                )
+            except (FileNotFoundError, ProcessLookupError):
+                # exited or restarted with another pid
+                continue
+            self.first.setdefault(name, point)
+            self.series.setdefault(name, deque(maxlen=self.size)).append(point)
+
+    def _run(self):
+        self.sample()
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def summary(self):
+        "peak rss and fds, cpu seconds and bytes read and written of each process"
+        result = {}
+        for name, points in self.series.items():
+            first, last = self.first[name], points[-1]
+            result[name] = {
+                "samples": len(points),
+                "duration": last[0] - first[0],
+                "peak_rss": max(p[1] for p in points),
+                "cpu_seconds": last[2] - first[2],
+                "peak_fds": max(p[3] for p in points),
+                "bytes_read": last[4] - first[4],
+                "bytes_written": last[5] - first[5],
+            }
+        return result
+
+    def check(self, **limits):
+        "the processes exceeding the limits on the summary, e.g. peak_rss=2**30"
+        return [
+            f"{name}: {metric} {stats[metric]} > {limit}"
+            for name, stats in self.summary().items()
+            for metric, limit in limits.items()
+            if stats[metric] > limit
+        ]
+
+
+_tracer = None
+# CometBFT rpc of the node behind each json-rpc endpoint, registered by the
+# clusters, the eth block timestamp only has a 1s resolution
+COMETBFT_RPC = {}
+
+
+def cometbft_block_time(rpc, height):
+    "wall time of a CometBFT block header, at sub-second precision"
+    rsp = requests.get(f"{rpc}/block", params={"height": height})
+    return isoparse(rsp.json()["result"]["block"]["header"]["time"]).timestamp()
+
+
+def current_tx_tracer():
+    "the active tracer, the send helpers only record txs when it's set"
+    return _tracer
+
+
+class TxTracer:
+    """
+    record the lifecycle of the txs sent while it's active, as monotonic
+    timestamps: submit, rpc ack, first seen in the mempool, block inclusion
+    (converted from the CometBFT block time, or when the block is first seen
+    on nodes without one, like geth) and receipt availability.
+
+    the mempool and new blocks are polled by background threads, started on
+    the first tx sent to each endpoint.
+    """
+
+    def __init__(self, name="", maxlen=TX_TRACE_SIZE, interval=TX_TRACE_INTERVAL):
+        self.name = name
+        self.records = deque(maxlen=maxlen)
+        self.interval = interval
+        # wall clock - monotonic clock, to convert block times
+        self.offset = time.time() - time.monotonic()
+        self._outstanding = {}
+        self._watchers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        global _tracer
+        self._previous, _tracer = _tracer, self
+        return self
+
+    def __exit__(self, *exc):
+        global _tracer
+        _tracer = self._previous
+        self._stop.set()
+        for thread in self._watchers.values():
+            thread.join()
+        # txs included before they were registered, only the block is known,
+        # the receipt time stays unset to keep them out of the receipt latency
+        for record in list(self._outstanding.values()):
+            if record["kind"] == "eth":
+                w3 = record["client"]
+                try:
+                    receipt = w3.eth.get_transaction_receipt(record["hash"])
+                except TransactionNotFound:
+                    continue
+                record["block"] = receipt.blockNumber
+                record["included"] = self._block_time(w3, receipt.blockNumber)
+
+    def _record(self, kind, client, txhash, submit, watch):
+        record = {
+            "name": self.name,
+            "kind": kind,
+            "client": client,
+            "hash": txhash,
+            "submit": submit,
+            "ack": time.monotonic(),
+            "pending": None,
+            "included": None,
+            "receipt": None,
+            "block": None,
+        }
+        with self._lock:
+            self.records.append(record)
+            self._outstanding[txhash] = record
+            key, target = watch
+            if key not in self._watchers:
+                thread = threading.Thread(target=target, daemon=True)
+                self._watchers[key] = thread
+                thread.start()
+        return record
+
+    def eth_submitted(self, w3, txhash, submit):
+        "record an eth tx acknowledged by the json-rpc"
+        txhash = HexBytes(txhash).hex()
+        key = ("eth", w3.provider.endpoint_uri)
+        watch = (key, lambda: self._watch_eth(w3))
+        return self._record("eth", w3, txhash, submit, watch)
+
+    def cosmos_submitted(self, rpc, txhash, submit):
+        "record a cosmos tx accepted by CheckTx"
+        txhash = txhash.upper()
+        key = ("cosmos", rpc)
+        watch = (key, lambda: self._watch_cosmos(rpc))
+        return self._record("cosmos", rpc, txhash, submit, watch)
+
+    def _seen(self, txhash, now):
+        with self._lock:
+            record = self._outstanding.get(txhash)
+        if record is not None and record["pending"] is None:
+            record["pending"] = now
+
+    def _block_time(self, w3, height, seen=None):
+        """
+        monotonic time of the block from the CometBFT header of the node, or
+        `seen` for the nodes without one
+        """
+        rpc = COMETBFT_RPC.get(w3.provider.endpoint_uri)
+        if rpc is None:
+            return seen
+        return cometbft_block_time(rpc, height) - self.offset
+
+    def _include(self, record, height, included, now):
+        record["block"] = height
+        record["included"] = included
+        if record["receipt"] is None:
+            record["receipt"] = now
+        with self._lock:
+            self._outstanding.pop(record["hash"], None)
+
+    def eth_receipt(self, record, receipt, w3):
+        "the receipt is returned to the caller"
+        if record["block"] is None:
+            now = time.monotonic()
+            included = self._block_time(w3, receipt.blockNumber, now)
+            self._include(record, receipt.blockNumber, included, now)
+
+    def cosmos_included(self, record, rsp):
+        "the tx is found in a block"
+        if record["block"] is None:
+            now = time.monotonic()
+            height = int(rsp["height"])
+            # the tx response timestamp is truncated to the second
+            included = cometbft_block_time(record["client"], height) - self.offset
+            self._include(record, height, included, now)
+
+    def _watch_eth(self, w3):
+        flt = w3.eth.filter("pending")
+        height = w3.eth.block_number
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            for txhash in flt.get_new_entries():
+                self._seen(HexBytes(txhash).hex(), now)
+            latest = w3.eth.block_number
+            for height in range(height + 1, latest + 1):
+                receipts = w3.eth.get_block_receipts(height)
+                if not receipts:
+                    continue
+                now = time.monotonic()
+                included = self._block_time(w3, height, now)
+                for receipt in receipts:
+                    txhash = HexBytes(receipt.transactionHash).hex()
+                    with self._lock:
+                        record = self._outstanding.get(txhash)
+                    if record is not None:
+                        self._include(record, height, included, now)
+            height = latest
+
+    def _watch_cosmos(self, rpc):
+        while not self._stop.wait(self.interval):
+            rsp = requests.get(f"{rpc}/unconfirmed_txs", params={"limit": 100})
+            now = time.monotonic()
+            for tx in rsp.json()["result"]["txs"] or []:
+                txhash = hashlib.sha256(base64.b64decode(tx)).hexdigest().upper()
+                self._seen(txhash, now)
+
+    def latencies(self):
+        "the latency of each stage since submit, per tx"
+        return [
+            {
+                "kind": r["kind"],
+                "hash": r["hash"],
+                "block": r["block"],
+                **{
+                    stage: None if r[stage] is None else r[stage] - r["submit"]
+                    for stage in TX_STAGES
+                },
+            }
+            for r in self.records
+        ]
+
+    def summary(self):
+        "percentiles of the latency of each stage"
+        latencies = self.latencies()
+        return {
+            stage: summarize(latency[stage] for latency in latencies)
+            for stage in TX_STAGES
+        }
+
+    def export(self, path):
+        "write the latencies to a json (with summary) or csv file"
+        path = Path(path)
+        latencies = self.latencies()
+        if path.suffix == ".csv":
+            with path.open("w", newline="") as fp:
+                writer = csv.DictWriter(
+                    fp, fieldnames=["kind", "hash", "block"] + TX_STAGES
+                )
+                writer.writeheader()
+                writer.writerows(latencies)
+        else:
+            path.write_text(
+                json.dumps(
+                    {"name": self.name, "summary": self.summary(), "txs": latencies},
+                    indent=2,
+                )
+            )
+        return path
+
+
+class BlockWatcher:
+    """
+    record the wall time each new block is first seen, by polling the json-rpc
+    block number in a background thread while it's active.
+    """
+
+    def __init__(self, w3, interval=TX_TRACE_INTERVAL):
+        self.w3 = w3
+        self.interval = interval
+        self.seen = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _watch(self):
+        height = self.w3.eth.block_number
+        while not self._stop.wait(self.interval):
+            latest = self.w3.eth.block_number
+            now = time.time()
+            for h in range(height + 1, latest + 1):
+                self.seen[h] = now
+            height = latest
+
+
+class LogWatcher:
+    """
+    tail a log file in a background thread while it's active, record the wall
+    time of each new line matching one of the named patterns.
+    """
+
+    def __init__(self, path, patterns, interval=TX_TRACE_INTERVAL):
+        self.path = Path(path)
+        self.patterns = {name: re.compile(p) for name, p in patterns.items()}
+        self.interval = interval
+        self.events = {name: [] for name in patterns}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        offset = self.path.stat().st_size if self.path.exists() else 0
+        self._thread = threading.Thread(target=self._watch, args=(offset,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _watch(self, offset):
+        while not self.path.exists():
+            if self._stop.wait(self.interval):
+                return
+        with self.path.open(errors="ignore") as fp:
+            fp.seek(offset)
+            line = ""
+            while True:
+                line += fp.readline()
+                if not line.endswith("\n"):
+                    if self._stop.wait(self.interval):
+                        return
+                    continue
+                now = time.time()
+                for name, pattern in self.patterns.items():
+                    if pattern.search(line):
+                        self.events[name].append(now)
+                line = ""
+
+    def rate(self, name):
+        "matching lines per second between the first and the last one"
+        events = self.events[name]
+        if len(events) < 2 or events[-1] == events[0]:
+            return None
+        return (len(events) - 1) / (events[-1] - events[0])
+
+
+# requests per benchmark, and the number of concurrent clients sending them
+BENCHMARK_REQUESTS = int(os.getenv("BENCHMARK_REQUESTS", 200))
+BENCHMARK_CONCURRENCY = int(os.getenv("BENCHMARK_CONCURRENCY", 8))
+# max allowed relative regression against the baseline
+BENCHMARK_THRESHOLD = float(os.getenv("BENCHMARK_THRESHOLD", 0.2))
+
+
+def run_concurrently(fn, total=None, concurrency=None):
+    """
+    call `fn()` `total` times from `concurrency` threads, return the latency
+    percentiles and the throughput.
+    """
+    total = total or BENCHMARK_REQUESTS
+    concurrency = concurrency or BENCHMARK_CONCURRENCY
+
+    def worker(n):
+        latencies = []
+        for _ in range(n):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    counts = [
+        total // concurrency + (1 if i < total % concurrency else 0)
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = [lat for lats in executor.map(worker, counts) for lat in lats]
+    elapsed = time.perf_counter() - start
+    return summarize(latencies) | {
+        "concurrency": concurrency,
+        "throughput": total / elapsed,
+    }
+
+
+class BenchmarkResults:
+    """
+    benchmark results of a test session, saved to a json file and compared
+    against a baseline file of the same format.
+
+    lower is better for the latency percentiles and higher is better for the
+    throughput, a result regresses if it's worse than the baseline by more
+    than `threshold`.
+    """
+
+    LOWER_IS_BETTER = [f"p{p}" for p in PERCENTILES]
+    HIGHER_IS_BETTER = ["throughput"]
+
+    def __init__(self, path=None, baseline=None, threshold=BENCHMARK_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.baseline = {}
+        if baseline and Path(baseline).exists():
+            self.baseline = json.loads(Path(baseline).read_text())
+        self.results = {}
+
+    def record(self, name, result):
+        "record the result and return the regressions against the baseline"
+        self.results[name] = result
+        return self.regressions(name)
+
+    def regressions(self, name):
+        result = self.results[name]
+        base = self.baseline.get(name, {})
+        regressions = []
+        for key in self.LOWER_IS_BETTER:
+            if base.get(key) and result.get(key, 0) > base[key] * (1 + self.threshold):
+                regressions.append(f"{name} {key}: {result[key]} > {base[key]}")
+        for key in self.HIGHER_IS_BETTER:
+            if base.get(key) and result.get(key, 0) < base[key] * (1 - self.threshold):
+                regressions.append(f"{name} {key}: {result[key]} < {base[key]}")
+        return regressions
+
+    def save(self):
+        if self.path and self.results:
+            path = Path(self.path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(self.results, indent=2, sort_keys=True))
+
+
+# checked-in gas used per named operation
+GAS_SNAPSHOT = Path(__file__).parent / "gas_snapshot.json"
+# record the gas used into the snapshot instead of asserting it
+GAS_SNAPSHOT_UPDATE = os.getenv("GAS_SNAPSHOT_UPDATE", "").lower() in ("1", "true")
+
+
+class GasSnapshot:
+    """
+    gas used per named operation, asserted against a snapshot file, or
+    written back to it in update mode.
+    """
+
+    def __init__(self, path=GAS_SNAPSHOT, update=GAS_SNAPSHOT_UPDATE):
+        self.path = Path(path)
+        self.update = update
+        self.expected = {}
+        if self.path.exists():
+            self.expected = json.loads(self.path.read_text())
+        self.recorded = {}
+
+    def check(self, name, gas_used):
+        self.recorded[name] = gas_used
+        if self.update:
+            return
+        assert (
+            name in self.expected
+        ), f"no gas snapshot for {name}, run with GAS_SNAPSHOT_UPDATE=1"
+        assert (
+            self.expected[name] == gas_used
+        ), f"{name}: exp {self.expected[name]}, got {gas_used}"
+
+    def diff(self):
+        "the recorded operations that differ from the snapshot"
+        return {
+            name: (self.expected.get(name), gas_used)
+            for name, gas_used in sorted(self.recorded.items())
+            if self.expected.get(name) != gas_used
+        }
+
+    def report(self):
+        "per operation gas delta against the snapshot, one line each"
+        lines = []
+        for name, (expected, gas_used) in self.diff().items():
+            if expected is None:
+                lines.append(f"{name}: new {gas_used}")
+            else:
+                delta = gas_used - expected
+                lines.append(
+                    f"{name}: {expected} -> {gas_used} "
+                    f"({delta:+d}, {delta / expected:+.2%})"
+                )
+        return lines
+
+    def save(self):
+        "merge the recorded gas into the snapshot file in update mode"
+        if self.update and self.diff():
+            self.expected |= self.recorded
+            self.path.write_text(
+                json.dumps(self.expected, indent=2, sort_keys=True) + "\n"
+            )
+
+
+GAS_SNAPSHOTS = GasSnapshot()
+
+
+def assert_gas_used(name, gas_used):
+    "check the gas used by the named operation against the snapshot"
+    GAS_SNAPSHOTS.check(name, gas_used)
+
+
+# directory of the trace cache, a temporary one per session if not set, a
+# persistent one only hits for the blocks of a reused chain
+TRACE_CACHE_DIR = os.getenv("TRACE_CACHE_DIR")
+
+
+class TraceCache:
+    """
+    content-addressed on-disk cache of trace results, keyed by the client
+    version of the node, the hash of the traced block, the method and its
+    params, so unchanged blocks are not traced again by the same binary, and
+    an upgraded tracer is never compared with the results of the old one.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._versions = {}
+
+    @staticmethod
+    def key(client_version, block_hash, method, params):
+        content = json.dumps(
+            [client_version, HexBytes(block_hash).hex(), method, params],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _file(self, key):
+        return self.path / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        path = self._file(key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def put(self, key, result):
+        path = self._file(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(result))
+        tmp.replace(path)
+
+    def client_version(self, w3):
+        "web3_clientVersion of the node, queried once per provider"
+        endpoint = w3.provider.endpoint_uri
+        if endpoint not in self._versions:
+            self._versions[endpoint] = w3.client_version
+        return self._versions[endpoint]
+
+    def trace(self, w3, block_hash, method, params):
+        "return the cached result, or trace with the node and cache it"
+        key = self.key(self.client_version(w3), block_hash, method, params)
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        rsp = w3.provider.make_request(method, params)
+        assert "error" not in rsp, rsp["error"]
+        self.put(key, rsp["result"])
+        return rsp["result"]
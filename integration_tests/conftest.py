@@ -1,5 +1,19 @@
+import os
+import re
+from pathlib import Path
+from types import SimpleNamespace
+
 import pytest
 
+from .bench_utils import (
+    GAS_SNAPSHOTS,
+    RESOURCE_SAMPLE_INTERVAL,
+    TRACE_CACHE_DIR,
+    BenchmarkResults,
+    ResourceSampler,
+    TraceCache,
+    TxTracer,
+)
 from .network import (
     connect_custom_mantra,
     setup_geth,
@@ -12,12 +26,14 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "slow: marks tests as slow")
     config.addinivalue_line("markers", "asyncio: marks tests as asyncio")
     config.addinivalue_line("markers", "connect: marks connect related tests")
+    config.addinivalue_line("markers", "benchmark: marks performance benchmarks")
 
 
 def pytest_collection_modifyitems(items, config):
     keywordexpr = config.option.keyword
     markexpr = config.option.markexpr
     skip_connect = pytest.mark.skip(reason="Skipping connect tests by default")
+    skip_benchmark = pytest.mark.skip(reason="Skipping benchmarks by default")
     for item in items:
         # add "unmarked" marker to tests that have no markers
         if not any(item.iter_markers()):
@@ -31,6 +47,24 @@ def pytest_collection_modifyitems(items, config):
             ):
                 item.add_marker(skip_connect)
 
+        # skip benchmarks unless explicitly requested
+        if "benchmark" in item.keywords:
+            if not (
+                (keywordexpr and "benchmark" in keywordexpr)
+                or (markexpr and "benchmark" in markexpr)
+            ):
+                item.add_marker(skip_benchmark)
+
+
+def pytest_terminal_summary(terminalreporter):
+    "report the gas used that differs from the snapshot, and save it in update mode"
+    report = GAS_SNAPSHOTS.report()
+    if report:
+        terminalreporter.write_sep("=", "gas snapshot diff")
+        for line in report:
+            terminalreporter.write_line(line)
+    GAS_SNAPSHOTS.save()
+
 
 @pytest.fixture(scope="session")
 def suspend_capture(pytestconfig):
@@ -74,3 +108,84 @@ def connect_mantra():
 def geth(tmp_path_factory):
     path = tmp_path_factory.mktemp("geth")
     yield from setup_geth(path, 8545)
+
+
+@pytest.fixture
+def tx_tracer(request):
+    """
+    record the lifecycle latency of the txs sent by the test, exported to
+    `$TX_TRACE_DIR/<test>.json` and `.csv` if the env var is set.
+    """
+    with TxTracer(request.node.name) as tracer:
+        yield tracer
+    if directory := os.getenv("TX_TRACE_DIR"):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r"[^\w.-]", "_", request.node.name)
+        for suffix in [".json", ".csv"]:
+            tracer.export(directory / (name + suffix))
+
+
+@pytest.fixture(autouse=True)
+def trace_txs(request):
+    "trace the txs of all the tests when `TX_TRACE_DIR` is set"
+    if os.getenv("TX_TRACE_DIR"):
+        request.getfixturevalue("tx_tracer")
+    yield
+
+
+def process_pids(value):
+    "pids of the processes of the clusters in a fixture value, or its fields"
+    if hasattr(value, "process_pids"):
+        return value.process_pids()
+    if isinstance(value, SimpleNamespace):
+        value = vars(value).values()
+    elif not (isinstance(value, tuple) and hasattr(value, "_fields")):
+        # only the fields of named tuples like IBCNetwork
+        return {}
+    return {name: pid for v in value for name, pid in process_pids(v).items()}
+
+
+@pytest.fixture
+def resource_sampler(request):
+    """
+    sample the node, relayer and geth processes of the clusters used by the
+    test, the summary is attached to the report as the `resources` user
+    property, use `resource_sampler.check(peak_rss=...)` to assert thresholds.
+    """
+    sampler = ResourceSampler(float(RESOURCE_SAMPLE_INTERVAL or 1))
+    for value in list(request.node.funcargs.values()):
+        sampler.watch(process_pids(value))
+    with sampler:
+        yield sampler
+    summary = sampler.summary()
+    request.node.user_properties.append(("resources", summary))
+    for name, stats in summary.items():
+        print(name, stats)
+
+
+@pytest.fixture(autouse=True)
+def sample_resources(request):
+    "sample the processes of all the tests when `RESOURCE_SAMPLE_INTERVAL` is set"
+    if RESOURCE_SAMPLE_INTERVAL:
+        request.getfixturevalue("resource_sampler")
+    yield
+
+
+@pytest.fixture(scope="session")
+def benchmark_results():
+    """
+    results of the benchmarks, saved to `$BENCHMARK_RESULTS` and compared
+    against `$BENCHMARK_BASELINE`, with `$BENCHMARK_THRESHOLD` tolerance.
+    """
+    results = BenchmarkResults(
+        os.getenv("BENCHMARK_RESULTS"), os.getenv("BENCHMARK_BASELINE")
+    )
+    yield results
+    results.save()
+
+
+@pytest.fixture(scope="session")
+def trace_cache(tmp_path_factory):
+    "trace results cached in `$TRACE_CACHE_DIR`, or a temporary directory"
+    return TraceCache(TRACE_CACHE_DIR or tmp_path_factory.mktemp("traces"))
@@ -0,0 +1,109 @@
+"""
+build cosmos txs carrying ethereum txs in process, without the cli.
+"""
+
+import rlp
+from cprotobuf import Field, ProtoEntity
+from eth_account import Account
+from eth_utils import big_endian_to_int
+from hexbytes import HexBytes
+
+# the 18 decimals denom the evm module charges fees in
+EVM_DENOM = "aom"
+MSG_ETHEREUM_TX = "/cosmos.evm.vm.v1.MsgEthereumTx"
+EXTENSION_OPTIONS_ETHEREUM_TX = "/cosmos.evm.vm.v1.ExtensionOptionsEthereumTx"
+
+
+class Any(ProtoEntity):
+    type_url = Field("string", 1)
+    value = Field("bytes", 2)
+
+
+class Coin(ProtoEntity):
+    denom = Field("string", 1)
+    amount = Field("string", 2)
+
+
+class Fee(ProtoEntity):
+    amount = Field(Coin, 1, repeated=True)
+    gas_limit = Field("uint64", 2)
+    payer = Field("string", 3)
+    granter = Field("string", 4)
+
+
+class AuthInfo(ProtoEntity):
+    # signer_infos = 1, always empty for ethereum txs
+    fee = Field(Fee, 2)
+
+
+class TxBody(ProtoEntity):
+    messages = Field(Any, 1, repeated=True)
+    memo = Field("string", 2)
+    timeout_height = Field("uint64", 3)
+    extension_options = Field(Any, 1023, repeated=True)
+    non_critical_extension_options = Field(Any, 2047, repeated=True)
+
+
+class TxRaw(ProtoEntity):
+    body_bytes = Field("bytes", 1)
+    auth_info_bytes = Field("bytes", 2)
+    signatures = Field("bytes", 3, repeated=True)
+
+
+class MsgEthereumTx(ProtoEntity):
+    # fields 1 to 4 are reserved
+    from_ = Field("bytes", 5)
+    raw = Field("bytes", 6)
+
+
+# position of the (max fee per) gas price and gas limit fields by tx type
+TYPED_TX_FEE_FIELDS = {
+    1: (2, 3),  # access list
+    2: (3, 4),  # dynamic fee
+    3: (3, 4),  # blob
+    4: (3, 4),  # set code
+}
+
+
+def eth_tx_fee(raw):
+    "return the gas limit and the fee (max fee per gas * gas) of a signed tx"
+    if raw[0] >= 0xC0:
+        fields = rlp.decode(raw)
+        price, gas = fields[1], fields[2]
+    else:
+        fields = rlp.decode(raw[1:])
+        price_idx, gas_idx = TYPED_TX_FEE_FIELDS[raw[0]]
+        price, gas = fields[price_idx], fields[gas_idx]
+    gas = big_endian_to_int(gas)
+    return gas, big_endian_to_int(price) * gas
+
+
+def build_evm_batch_tx(raw_txs, senders=None):
+    """
+    wrap the signed ethereum txs into a single cosmos tx, return the encoded
+    TxRaw, the sender is recovered from the signature if not provided.
+    """
+    if senders is None:
+        senders = [Account.recover_transaction(raw) for raw in raw_txs]
+    msgs = []
+    fee = gas_limit = 0
+    for raw, sender in zip(raw_txs, senders):
+        raw = bytes(raw)
+        msg = MsgEthereumTx(from_=bytes(HexBytes(sender)), raw=raw)
+        msgs.append(Any(type_url=MSG_ETHEREUM_TX, value=msg.SerializeToString()))
+        gas, amount = eth_tx_fee(raw)
+        gas_limit += gas
+        fee += amount
+    body = TxBody(
+        messages=msgs,
+        extension_options=[Any(type_url=EXTENSION_OPTIONS_ETHEREUM_TX)],
+    )
+    auth_info = AuthInfo(
+        fee=Fee(amount=[Coin(denom=EVM_DENOM, amount=str(fee))], gas_limit=gas_limit)
+    )
+    return bytes(
+        TxRaw(
+            body_bytes=body.SerializeToString(),
+            auth_info_bytes=auth_info.SerializeToString(),
+        ).SerializeToString()
+    )
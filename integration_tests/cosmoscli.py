@@ -1,10 +1,13 @@
+import base64
 import json
 import subprocess
 import tempfile
+import time
 
 import requests
 from pystarport.utils import build_cli_args_safe, interact
 
+from .bench_utils import current_tx_tracer
 from .utils import DEFAULT_GAS, DEFAULT_GAS_PRICE, get_sync_info
 
 
@@ -153,13 +156,70 @@ class CosmosCLI:
     def broadcast_tx(self, tx_file, **kwargs):
         kwargs.setdefault("broadcast_mode", "sync")
         kwargs.setdefault("output", "json")
+        submit = time.monotonic()
         rsp = json.loads(
             self.raw("tx", "broadcast", tx_file, node=self.node_rpc, **kwargs)
         )
         if rsp.get("code") == 0:
-            rsp = self.event_query_tx_for(rsp["txhash"], **kwargs)
+            rsp = self.wait_tx_included(rsp["txhash"], submit, **kwargs)
         return rsp
 
+    def wait_tx_included(self, txhash, submit, **kwargs):
+        "wait for the accepted tx, recorded by the active tx tracer if any"
+        tracer = current_tx_tracer()
+        if tracer is None:
+            return self.event_query_tx_for(txhash, **kwargs)
+        record = tracer.cosmos_submitted(self.node_rpc_http, txhash, submit)
+        rsp = self.event_query_tx_for(txhash, **kwargs)
+        tracer.cosmos_included(record, rsp)
+        return rsp
+
+    def broadcast_tx_bytes(self, tx, wait=True, check=True, **kwargs):
+        """
+        broadcast an encoded tx through the CometBFT rpc, wait for it if accepted,
+        with `check=False` the rpc errors like a full mempool or a tx already in
+        the cache are returned as a rejection with the `rpc` codespace.
+        """
+        submit = time.monotonic()
+        rsp = requests.post(
+            self.node_rpc_http,
+            json={
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "broadcast_tx_sync",
+                "params": {"tx": base64.b64encode(tx).decode()},
+            },
+        ).json()
+        if "error" in rsp:
+            assert not check, rsp["error"]
+            error = rsp["error"]
+            return {
+                "code": error["code"],
+                "codespace": "rpc",
+                "raw_log": error.get("data") or error["message"],
+                "txhash": None,
+            }
+        result = rsp["result"]
+        rsp = {
+            "code": result["code"],
+            "codespace": result["codespace"],
+            "raw_log": result["log"],
+            "txhash": result["hash"],
+        }
+        if rsp["code"] == 0 and wait:
+            rsp = self.wait_tx_included(rsp["txhash"], submit, **kwargs)
+        return rsp
+
+    def rpc_block(self, height):
+        "the CometBFT block at the height, with the encoded txs"
+        rsp = requests.get(f"{self.node_rpc_http}/block", params={"height": height})
+        return rsp.json()["result"]["block"]
+
+    def num_unconfirmed_txs(self):
+        "number of txs in the CometBFT mempool"
+        rsp = requests.get(f"{self.node_rpc_http}/num_unconfirmed_txs").json()
+        return int(rsp["result"]["total"])
+
     def broadcast_tx_json(self, tx, **kwargs):
         with tempfile.NamedTemporaryFile("w") as fp:
             json.dump(tx, fp)
@@ -223,20 +283,6 @@ class CosmosCLI:
             )
         )
 
-    def build_evm_tx(self, raw_tx: str, **kwargs):
-        default_kwargs = self.get_kwargs()
-        return json.loads(
-            self.raw(
-                "tx",
-                "evm",
-                "raw",
-                raw_tx,
-                "-y",
-                "--generate-only",
-                **(default_kwargs | kwargs),
-            )
-        )
-
     def submit_gov_proposal(self, proposal, **kwargs):
         rsp = json.loads(
             self.raw(
@@ -512,6 +558,20 @@ class CosmosCLI:
             )
         )
 
+    def tx_search_rpc_all(self, events: str, per_page=100):
+        "all the txs matching the events, across the result pages"
+        txs, page = [], 1
+        while True:
+            rsp = requests.get(
+                f"{self.node_rpc_http}/tx_search",
+                params={"query": f'"{events}"', "page": page, "per_page": per_page},
+            ).json()
+            assert "error" not in rsp, rsp["error"]
+            txs += rsp["result"]["txs"]
+            if len(txs) >= int(rsp["result"]["total_count"]):
+                return txs
+            page += 1
+
     def tx_search_rpc(self, events: str):
         rsp = requests.get(
             f"{self.node_rpc_http}/tx_search",
@@ -748,6 +808,28 @@ class CosmosCLI:
             )
         ).get("blacklisted_accounts", [])
 
+    def ibc_transfer(
+        self, from_, to, amount, channel="channel-0", generate_only=False, **kwargs
+    ):
+        rsp = json.loads(
+            self.raw(
+                "tx",
+                "ibc-transfer",
+                "transfer",
+                "transfer",
+                channel,
+                to,
+                amount,
+                "-y",
+                "--generate-only" if generate_only else None,
+                from_=from_,
+                **(self.get_kwargs_with_gas() | kwargs),
+            )
+        )
+        if rsp.get("code") == 0:
+            rsp = self.event_query_tx_for(rsp["txhash"])
+        return rsp
+
     def ibc_denom_hash(self, path, **kwargs):
         return json.loads(
             self.raw(
@@ -0,0 +1,251 @@
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from eth_utils import to_checksum_address
+from web3.exceptions import TransactionNotFound
+
+from .bench_utils import summarize
+from .utils import ARTIFACTS, contract_address, derive_random_account, fund_acc
+
+DIFF_SEED = int(os.getenv("DIFF_SEED", 0))
+DIFF_STEPS = int(os.getenv("DIFF_STEPS", 50))
+# json file of the full diff report and latencies
+DIFF_REPORT = os.getenv("DIFF_REPORT")
+# diffs printed per category, the report keeps all of them
+DIFF_PRINT_LIMIT = 10
+# the same gas limit on every node keeps the gas of the trace frames comparable
+DIFF_TX_GAS = 3000000
+DIFF_TIP = 10**9
+DIFF_TIMEOUT = 120
+DIFF_CONTRACTS = ["TestERC20A", "TestMessageCall", "Greeter", "TestRevert"]
+# fields depending on the chain id, the block or the fee market
+IGNORED_FIELDS = {
+    "blockHash",
+    "blockNumber",
+    "blockTimestamp",
+    "cumulativeGasUsed",
+    "effectiveGasPrice",
+    "logIndex",
+    "logsBloom",
+    "transactionHash",
+    "transactionIndex",
+}
+
+
+def generate_steps(seed, count):
+    """
+    deterministic tx sequence, the test contracts are deployed first, then a
+    random mix of transfers, token transfers, message calls, storage writes and
+    reverts, followed by the view calls checking the resulting state.
+    contracts are referred by name and resolved on each node.
+    """
+    rnd = random.Random(seed)
+    recipients = []
+
+    def recipient():
+        addr = to_checksum_address(rnd.randbytes(20))
+        recipients.append(addr)
+        return addr
+
+    def call(contract, fn, *args):
+        return {"contract": contract, "fn": fn, "args": list(args)}
+
+    choices = [
+        lambda: {"to": recipient(), "value": rnd.randint(1, 10**15)},
+        lambda: call("TestERC20A", "transfer", recipient(), rnd.randint(1, 10**18)),
+        # more than the total supply, reverts
+        lambda: call("TestERC20A", "transfer", recipient(), 10**30),
+        lambda: call("TestERC20A", "test_log0"),
+        lambda: call("TestMessageCall", "test", rnd.randint(1, 20)),
+        lambda: call("Greeter", "setGreeting", rnd.randbytes(rnd.randint(1, 64)).hex()),
+        # reverts below 5 * 10**18
+        lambda: call("TestRevert", "transfer", rnd.randint(0, 10**19)),
+        lambda: call("TestRevert", "revertWithMsg"),
+    ]
+    txs = [{"deploy": name} for name in DIFF_CONTRACTS]
+    txs += [rnd.choice(choices)() for _ in range(count)]
+    views = [
+        call("TestERC20A", "totalSupply"),
+        call("TestMessageCall", "inner"),
+        call("Greeter", "greet"),
+        call("TestRevert", "query"),
+    ]
+    for addr in recipients:
+        views += [call("TestERC20A", "balanceOf", addr), {"balance": addr}]
+    return txs, views
+
+
+def normalize(value):
+    "drop the ignored fields and lower case the hex strings, recursively"
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items() if k not in IGNORED_FIELDS}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    if isinstance(value, str) and value.startswith("0x"):
+        return value.lower()
+    return value
+
+
+def diff(a, b, path=""):
+    "the paths and values where two normalized results differ"
+    if isinstance(a, dict) and isinstance(b, dict):
+        return [
+            d
+            for k in sorted(a.keys() | b.keys())
+            for d in diff(a.get(k), b.get(k), f"{path}.{k}")
+        ]
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        return [
+            d for i, (x, y) in enumerate(zip(a, b)) for d in diff(x, y, f"{path}[{i}]")
+        ]
+    return [] if a == b else [(path, a, b)]
+
+
+class Replay:
+    "replay the steps on a node from a fresh sender, timing each json-rpc method"
+
+    def __init__(self, w3, acct):
+        self.w3 = w3
+        self.acct = acct
+        self.latencies = defaultdict(list)
+        self.addresses = {}
+
+    def request(self, method, *params):
+        "the raw json-rpc response"
+        start = time.perf_counter()
+        rsp = self.w3.provider.make_request(method, list(params))
+        self.latencies[method].append(time.perf_counter() - start)
+        return rsp
+
+    def rpc(self, method, *params):
+        rsp = self.request(method, *params)
+        return rsp["result"] if "error" not in rsp else {"error": rsp["error"]}
+
+    def build(self, step, nonce, chain_id, max_fee):
+        tx = {
+            "nonce": nonce,
+            "gas": DIFF_TX_GAS,
+            "maxFeePerGas": max_fee,
+            "maxPriorityFeePerGas": DIFF_TIP,
+            "chainId": chain_id,
+        }
+        if "deploy" in step:
+            name = step["deploy"]
+            self.addresses[name] = contract_address(self.acct.address, nonce)
+            tx["data"] = ARTIFACTS[name].initcode()
+        elif "contract" in step:
+            artifact = ARTIFACTS[step["contract"]]
+            tx["to"] = self.addresses[step["contract"]]
+            tx["data"] = artifact.encode(step["fn"], *step["args"])
+        else:
+            tx["to"], tx["value"] = step["to"], step["value"]
+        return tx
+
+    def view(self, step):
+        if "balance" in step:
+            return self.rpc("eth_getBalance", step["balance"], "latest")
+        artifact = ARTIFACTS[step["contract"]]
+        data = artifact.encode(step["fn"], *step["args"])
+        to = self.addresses[step["contract"]]
+        return self.rpc("eth_call", {"to": to, "data": "0x" + data.hex()}, "latest")
+
+    def run(self, txs, views):
+        chain_id = int(self.rpc("eth_chainId"), 16)
+        block = self.rpc("eth_getBlockByNumber", "latest", False)
+        max_fee = int(block["baseFeePerGas"], 16) * 3 + DIFF_TIP
+        nonce = int(
+            self.rpc("eth_getTransactionCount", self.acct.address, "latest"), 16
+        )
+        hashes = []
+        for i, step in enumerate(txs):
+            tx = self.build(step, nonce + i, chain_id, max_fee)
+            raw = self.acct.sign_transaction(tx).raw_transaction
+            rsp = self.request("eth_sendRawTransaction", "0x" + raw.hex())
+            assert "error" not in rsp, (step, rsp["error"])
+            hashes.append(rsp["result"])
+        deadline = time.time() + DIFF_TIMEOUT
+        while True:
+            try:
+                self.w3.eth.get_transaction_receipt(hashes[-1])
+                break
+            except TransactionNotFound:
+                assert time.time() < deadline, "replay txs are not included"
+                time.sleep(0.5)
+        receipts = [self.rpc("eth_getTransactionReceipt", h) for h in hashes]
+        heights = [int(r["blockNumber"], 16) for r in receipts]
+        # by block range only, so the logs of the inner contracts are included,
+        # the logs of the other txs in these blocks are dropped
+        logs = self.rpc(
+            "eth_getLogs",
+            {"fromBlock": hex(min(heights)), "toBlock": hex(max(heights))},
+        )
+        assert "error" not in logs, logs
+        replayed = {h.lower() for h in hashes}
+        logs = [log for log in logs if log["transactionHash"].lower() in replayed]
+        tracer = {"tracer": "callTracer"}
+        return {
+            "receipts": normalize(receipts),
+            "logs": normalize(logs),
+            "traces": normalize(
+                [self.rpc("debug_traceTransaction", h, tracer) for h in hashes]
+            ),
+            "calls": normalize([self.view(step) for step in views]),
+        }
+
+
+def differential_replay(nodes, txs, views):
+    """
+    replay the steps on all the nodes in parallel from the same fresh sender,
+    so the nonces and contract addresses match, return the normalized results
+    and the per method latencies of each node.
+    """
+    acct = derive_random_account()
+    for w3 in nodes.values():
+        fund_acc(w3, acct)
+    replays = {name: Replay(w3, acct) for name, w3 in nodes.items()}
+    with ThreadPoolExecutor(len(replays)) as executor:
+        futures = {
+            name: executor.submit(replay.run, txs, views)
+            for name, replay in replays.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    latencies = {name: replay.latencies for name, replay in replays.items()}
+    return results, latencies
+
+
+def diff_report(results, latencies, path=DIFF_REPORT):
+    """
+    diff each category of the results against the first node, print the diff
+    counts with the first diffs and the per method p50 latency side by side,
+    save everything to `path` if set, return the diffs per category.
+    """
+    (base, expected), *others = results.items()
+    diffs = {}
+    for name, result in others:
+        for category, value in expected.items():
+            key = f"{category}/{base}-{name}"
+            diffs[key] = diff(value, result[category], category)
+            print(f"{key}: {len(diffs[key])} diffs")
+            for d in diffs[key][:DIFF_PRINT_LIMIT]:
+                print("  ", *d)
+    stats = {
+        method: {name: summarize(latencies[name].get(method, [])) for name in latencies}
+        for method in sorted({m for lats in latencies.values() for m in lats})
+    }
+    print(f"{'method':32}", *(f"{name + ' p50':>14}" for name in latencies))
+    for method, per_node in stats.items():
+        p50 = (per_node[name].get("p50") for name in latencies)
+        print(
+            f"{method:32}",
+            *(f"{'-':>14}" if p is None else f"{p * 1000:12.2f}ms" for p in p50),
+        )
+    if path:
+        Path(path).write_text(
+            json.dumps({"diffs": diffs, "latencies": stats}, indent=2, default=str)
+        )
+    return diffs
@@ -1,19 +1,33 @@
 import json
+import math
 import subprocess
 from contextlib import contextmanager
 from pathlib import Path
 from typing import NamedTuple
 
+import requests
 from pystarport import cluster, ports
 
 from .network import Hermes, Mantra, setup_custom_mantra
 from .utils import (
     DEFAULT_DENOM,
+    DEFAULT_GAS_AMT,
     escrow_address,
     wait_for_new_blocks,
     wait_for_port,
 )
 
+# the path started by the relayer-demo program when pystarport sets up rly
+RLY_PATH = "chainmain-cronos"
+# messages sent by the relayer, indexed by the message.action of configs/ibc
+RELAYER_ACTIONS = [
+    "/ibc.core.client.v1.MsgUpdateClient",
+    "/ibc.core.channel.v1.MsgRecvPacket",
+    "/ibc.core.channel.v1.MsgAcknowledgement",
+]
+# gas limit of each transfer message in a bulk transfer tx
+IBC_TRANSFER_GAS = 150000
+
 
 class IBCNetwork(NamedTuple):
     ibc1: Mantra
@@ -51,13 +65,46 @@ def call_hermes_cmd(hermes, incentivized, version):
     )
 
 
-def prepare_network(tmp_path, name):
+def call_rly_cmd(path, version):
+    subprocess.check_call(
+        [
+            "rly",
+            "pth",
+            "new",
+            "mantra-canary-net-1",
+            "mantra-canary-net-2",
+            RLY_PATH,
+            "--home",
+            path,
+        ]
+    )
+    subprocess.check_call(
+        [
+            "rly",
+            "tx",
+            "connect",
+            RLY_PATH,
+            "--src-port",
+            "transfer",
+            "--dst-port",
+            "transfer",
+            "--order",
+            "unordered",
+            "--version",
+            version["app_version"],
+            "--home",
+            path,
+        ]
+    )
+
+
+def prepare_network(tmp_path, name, relayer=cluster.Relayer.HERMES.value):
     name = f"configs/{name}.jsonnet"
     with contextmanager(setup_custom_mantra)(
         tmp_path,
         27000,
         Path(__file__).parent / name,
-        relayer=cluster.Relayer.HERMES.value,
+        relayer=relayer,
     ) as ibc1:
         cli = ibc1.cosmos_cli()
         ibc2 = Mantra(ibc1.base_dir.parent / "mantra-canary-net-2")
@@ -68,11 +115,16 @@ def prepare_network(tmp_path, name):
         wait_for_new_blocks(cli, 1)
         version = {"fee_version": "ics29-1", "app_version": "ics20-1"}
         path = ibc1.base_dir.parent / "relayer"
-        hermes = Hermes(path.with_suffix(".toml"))
-        call_hermes_cmd(hermes, False, version)
+        hermes = None
+        if relayer == cluster.Relayer.RLY.value:
+            call_rly_cmd(path, version)
+        else:
+            hermes = Hermes(path.with_suffix(".toml"))
+            call_hermes_cmd(hermes, False, version)
         ibc1.supervisorctl("start", "relayer-demo")
         yield IBCNetwork(ibc1, ibc2, hermes)
-        wait_for_port(hermes.port)
+        if hermes is not None:
+            wait_for_port(hermes.port)
 
 
 def hermes_transfer(
@@ -96,3 +148,61 @@ def hermes_transfer(
         cmd += f" --memo '{memo}'"
     subprocess.run(cmd, check=True, shell=True)
     return f"{port}/{channel}/{denom}", escrow_address(port, channel)
+
+
+def bulk_ibc_transfer(cli, sender, receiver, amount, msgs, channel="channel-0"):
+    """
+    send a single tx of `msgs` ibc transfers through the channel, return the
+    response and the sequences of the sent packets.
+    """
+    tx = cli.ibc_transfer(sender, receiver, amount, channel, generate_only=True)
+    tx["body"]["messages"] *= msgs
+    gas = IBC_TRANSFER_GAS * msgs
+    tx["auth_info"]["fee"]["gas_limit"] = str(gas)
+    tx["auth_info"]["fee"]["amount"] = [
+        {"denom": DEFAULT_DENOM, "amount": str(math.ceil(gas * DEFAULT_GAS_AMT))}
+    ]
+    signed = cli.sign_tx_json(tx, sender)
+    rsp = cli.broadcast_tx_json(signed)
+    assert rsp["code"] == 0, rsp["raw_log"]
+    sequences = []
+    for ev in rsp["events"]:
+        if ev["type"] == "send_packet":
+            attrs = {attr["key"]: attr["value"] for attr in ev["attributes"]}
+            sequences.append(int(attrs["packet_sequence"]))
+    assert len(sequences) == msgs, rsp
+    return rsp, sequences
+
+
+def packet_commitments(ibc, channel="channel-0"):
+    "sequences of the packets sent by the first chain and not acknowledged yet"
+    port = ports.api_port(ibc.ibc1.base_port(0))
+    rsp = requests.get(
+        f"http://127.0.0.1:{port}/ibc/core/channel/v1/channels/{channel}"
+        "/ports/transfer/packet_commitments",
+        params={"pagination.limit": 100000},
+    ).json()
+    return {int(c["sequence"]) for c in rsp["commitments"]}
+
+
+def relayer_gas(cli, relayer, height):
+    """
+    gas used by the txs sent by the relayer since the height, only
+    message.action is indexed so the txs are searched by the relayer messages,
+    then filtered on the sender of their message events.
+    """
+    txs = {}
+    for action in RELAYER_ACTIONS:
+        query = f"message.action='{action}' AND tx.height>={height}"
+        for tx in cli.tx_search_rpc_all(query):
+            txs[tx["hash"]] = tx
+    return sum(
+        int(tx["tx_result"]["gas_used"])
+        for tx in txs.values()
+        if any(
+            attr["key"] == "sender" and attr["value"] == relayer
+            for event in tx["tx_result"]["events"]
+            if event["type"] == "message"
+            for attr in event["attributes"]
+        )
+    )
@@ -1,5 +1,6 @@
 import json
 import os
+import re
 import signal
 import subprocess
 from pathlib import Path
@@ -10,8 +11,10 @@ from pystarport import cluster, ports
 from web3 import AsyncHTTPProvider, AsyncWeb3
 from web3.middleware import ExtraDataToPOAMiddleware
 
+from .bench_utils import COMETBFT_RPC
 from .cosmoscli import CosmosCLI
 from .utils import (
+    DeploymentCache,
     supervisorctl,
     wait_for_block,
     wait_for_port,
@@ -27,6 +30,7 @@ class Mantra:
         self.config = json.loads((base_dir / "config.json").read_text())
         self.chain_binary = chain_binary
         self._use_websockets = False
+        self.deployments = DeploymentCache(self)
 
     def copy(self):
         return Mantra(self.base_dir)
@@ -52,12 +56,20 @@ class Mantra:
         return self._async_w3
 
     def node_w3(self, i=0):
+        self.register_cometbft_rpc(i)
         if self._use_websockets:
             return web3.Web3(web3.providers.WebsocketProvider(self.w3_ws_endpoint(i)))
         else:
             return web3.Web3(web3.providers.HTTPProvider(self.w3_http_endpoint(i)))
 
+    def register_cometbft_rpc(self, i=0):
+        "let the tx tracer read the block times of the node from CometBFT"
+        rpc = "http" + self.node_rpc(i).removeprefix("tcp")
+        COMETBFT_RPC[self.w3_http_endpoint(i)] = rpc
+        COMETBFT_RPC[self.w3_ws_endpoint(i)] = rpc
+
     def async_node_w3(self, i=0):
+        self.register_cometbft_rpc(i)
         return AsyncWeb3(
             AsyncHTTPProvider(self.w3_http_endpoint(i), cache_allowed_requests=True)
         )
@@ -81,6 +93,22 @@ class Mantra:
     def supervisorctl(self, *args):
         return supervisorctl(self.base_dir / "../tasks.ini", *args)
 
+    def node_pid(self, i=0):
+        "pid of the node process, managed by supervisor"
+        return int(self.supervisorctl("pid", f"{self.base_dir.name}-node{i}"))
+
+    def process_pids(self):
+        "pids of the running supervisor programs, the nodes and the relayer"
+        try:
+            status = self.supervisorctl("status")
+        except subprocess.CalledProcessError as e:
+            # non zero exit status when some programs are not running
+            status = e.output.decode()
+        return {
+            name: int(pid)
+            for name, pid in re.findall(r"^(\S+)\s+RUNNING\s+pid (\d+)", status, re.M)
+        }
+
 
 class Hermes:
     def __init__(self, config: Path):
@@ -99,6 +127,7 @@ class ConnectMantra:
         self.chain_id = chain_id
         self.chain_binary = chain_binary
         self._use_websockets = False
+        self.deployments = DeploymentCache(self)
 
     @property
     def w3(self):
@@ -192,9 +221,26 @@ def connect_custom_mantra():
 
 
 class Geth:
-    def __init__(self, w3, async_w3):
+    def __init__(self, w3, async_w3, pid=None):
         self.w3 = w3
         self.async_w3 = async_w3
+        self.deployments = DeploymentCache(self)
+        # pid of the start-geth script
+        self.pid = pid
+
+    def node_pid(self, i=0):
+        "pid of the geth process, a descendant of the start-geth script"
+        pids = [self.pid]
+        while pids:
+            pid = pids.pop()
+            if Path(f"/proc/{pid}/comm").read_text().strip() == "geth":
+                return pid
+            children = Path(f"/proc/{pid}/task/{pid}/children").read_text()
+            pids += [int(child) for child in children.split()]
+        raise ProcessLookupError(f"no geth process under {self.pid}")
+
+    def process_pids(self):
+        return {"geth": self.node_pid()}
 
 
 def setup_geth(path, base_port):
@@ -225,7 +271,7 @@ def setup_geth(path, base_port):
             w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
             async_w3 = AsyncWeb3(AsyncHTTPProvider(url, cache_allowed_requests=True))
             async_w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
-            yield Geth(w3, async_w3)
+            yield Geth(w3, async_w3, proc.pid)
         finally:
             os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
             # proc.terminate()
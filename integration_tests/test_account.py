@@ -1,11 +1,20 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 import web3
+from eth_account import Account
 
 from .utils import (
+    ACCOUNTS,
     ADDRS,
     KEYS,
+    AccountPool,
     assert_duplicate,
     derive_new_account,
+    eth_balances,
     send_transaction,
     w3_wait_for_new_blocks,
 )
@@ -54,3 +63,58 @@ def test_future_blk(mantra, connect_mantra):
     with pytest.raises(web3.exceptions.Web3RPCError) as exc:
         w3.eth.get_transaction_count(acc, hex(future))
     assert "cannot query with height in the future" in str(exc)
+
+
+@pytest.mark.asyncio
+async def test_account_pool(mantra, tmp_path):
+    w3 = mantra.async_w3
+    mnemonic = os.getenv("SIGNER2_MNEMONIC")
+    pool = AccountPool(mnemonic)
+    for n in [0, 1, 1000]:
+        path = f"m/44'/60'/0'/0/{n}"
+        expected = Account.from_mnemonic(mnemonic, account_path=path)
+        assert pool[n].key == expected.key
+        assert pool[n].address == expected.address
+
+    # fund in multiple batches
+    count = 120
+    amount = 10**15
+    accounts = await pool.fund(
+        w3, ACCOUNTS["signer2"], count, amount, start=1000, batch_size=50
+    )
+    balances = await eth_balances(w3, [acct.address for acct in accounts])
+    assert balances == [amount] * count
+
+    # load the persisted keys instead of deriving them again
+    file = tmp_path / "accounts.json"
+    pool.save(file)
+    loaded = AccountPool(mnemonic)
+    assert loaded.load(file) == len(pool)
+    assert loaded[1000 + count - 1].address == accounts[-1].address
+    assert AccountPool(os.getenv("SIGNER1_MNEMONIC")).load(file) == 0
+
+
+def test_utils_import_time():
+    "importing utils must not derive accounts or load artifacts eagerly"
+    code = (
+        "import time; t = time.perf_counter(); "
+        "import integration_tests.utils as u; "
+        "print(time.perf_counter() - t, len(u.ACCOUNTS._values), "
+        "u.weth_address.cache_info().currsize)"
+    )
+    out = subprocess.check_output(
+        [sys.executable, "-c", code], cwd=Path(__file__).parent.parent, text=True
+    )
+    elapsed, derived, weth = out.split()
+    print(f"import integration_tests.utils: {float(elapsed):.3f}s")
+    assert int(derived) == 0
+    assert int(weth) == 0
+    assert float(elapsed) < float(os.getenv("UTILS_IMPORT_TIME_LIMIT", "5"))
+
+    # accounts are derived once on first use
+    key = KEYS["validator"]
+    assert "validator" in ACCOUNTS._values
+    assert ACCOUNTS["validator"] is ACCOUNTS["validator"]
+    assert ACCOUNTS["validator"].key == key
+    assert ADDRS["validator"] == Account.from_key(key).address
+    assert "unknown" not in KEYS
@@ -9,12 +9,16 @@ from eth_contract.utils import send_transaction as send_transaction_async
 from eth_utils import abi, big_endian_to_int
 from hexbytes import HexBytes
 
+from .bench_utils import TxTracer, assert_gas_used
+from .cosmos_tx import AuthInfo, MsgEthereumTx, TxBody, TxRaw, build_evm_batch_tx
 from .utils import (
     ACCOUNTS,
     ADDRS,
+    ARTIFACTS,
     CONTRACTS,
     DEFAULT_DENOM,
     KEYS,
+    BlockReceipts,
     Greeter,
     RevertTestContract,
     assert_balance,
@@ -23,8 +27,11 @@ from .utils import (
     contract_address,
     deploy_contract,
     do_multisig,
+    load_artifact,
     recover_community,
+    send_raw_transactions,
     send_transaction,
+    sign_transaction,
     transfer_via_cosmos,
 )
 
@@ -65,15 +72,45 @@ def test_send_transaction(mantra):
     )
     receipt = w3.eth.wait_for_transaction_receipt(txhash)
     assert receipt.status == 1
-    assert receipt.gasUsed == 21000
+    assert_gas_used("transfer", receipt.gasUsed)
+
+
+def test_tx_lifecycle_trace(mantra, tmp_path):
+    w3 = mantra.w3
+    cli = mantra.cosmos_cli()
+    tx = {"to": ADDRS["community"], "value": 1000}
+    with TxTracer("lifecycle") as tracer:
+        send_transaction(w3, tx, KEYS["validator"])
+        raws = [
+            sign_transaction(w3, tx, KEYS[name]).raw_transaction
+            for name in ["signer1", "signer2"]
+        ]
+        for txhash in send_raw_transactions(w3, raws):
+            w3.eth.wait_for_transaction_receipt(txhash)
+        transfer_via_cosmos(cli, cli.address("community"), cli.address("reserve"), 1)
+
+    latencies = tracer.latencies()
+    assert [latency["kind"] for latency in latencies].count("eth") == 3
+    for latency in latencies:
+        assert latency["block"] is not None, latency
+        assert 0 < latency["ack"] <= latency["receipt"], latency
+    summary = tracer.summary()
+    print(summary)
+    assert summary["receipt"]["count"] == 4
+    assert summary["receipt"]["p50"] <= summary["receipt"]["p99"]
+
+    data = json.loads(tracer.export(tmp_path / "trace.json").read_text())
+    assert data["summary"] == summary
+    rows = tracer.export(tmp_path / "trace.csv").read_text().splitlines()
+    assert len(rows) == 5
 
 
 @pytest.mark.connect
 def test_connect_events(connect_mantra):
-    test_events(None, connect_mantra, exp_gas_used=None)
+    test_events(None, connect_mantra, gas_snapshot=None)
 
 
-def test_events(mantra, connect_mantra, exp_gas_used=914023):
+def test_events(mantra, connect_mantra, gas_snapshot="TestERC20A.deploy"):
     w3 = connect_mantra.w3
     sender = "community"
     receiver = "signer1"
@@ -81,7 +118,7 @@ def test_events(mantra, connect_mantra, exp_gas_used=914023):
         w3,
         CONTRACTS["TestERC20A"],
         key=KEYS[sender],
-        exp_gas_used=exp_gas_used,
+        gas_snapshot=gas_snapshot,
     )
     tx = erc20.functions.transfer(ADDRS[receiver], 10).build_transaction(
         {"from": ADDRS[sender]}
@@ -260,32 +297,20 @@ def test_transaction(mantra):
 
 
 def assert_receipt_transaction_and_block(w3, futures):
-    receipts = []
-    for future in as_completed(futures):
-        data = future.result()
-        receipts.append(data)
+    receipts = [future.result() for future in as_completed(futures)]
     assert len(receipts) == 4
 
     block_number = w3.eth.get_block_number()
-    tx_indexes = [0, 1, 2, 3]
+    block = BlockReceipts().fetch(w3, block_number)
+    block.verify()
+    assert len(block) == 4
+    assert sorted(r["transactionIndex"] for r in receipts) == [0, 1, 2, 3]
     for receipt in receipts:
         assert receipt["blockNumber"] == block_number
-        transaction_index = receipt["transactionIndex"]
-        assert transaction_index in tx_indexes
-        tx_indexes.remove(transaction_index)
-
-    block = w3.eth.get_block(block_number)
-    transactions = [
-        w3.eth.get_transaction_by_block(block_number, receipt["transactionIndex"])
-        for receipt in receipts
-    ]
-    assert len(transactions) == 4
-    for i, transaction in enumerate(transactions):
-        assert transaction["blockNumber"] == block_number
-        assert transaction["transactionIndex"] == receipts[i]["transactionIndex"]
-        assert transaction["hash"] == receipts[i]["transactionHash"]
-        assert transaction["hash"] in block["transactions"]
-        assert transaction["blockNumber"] == block["number"]
+        indexed = block[receipt["transactionHash"]]
+        assert indexed["transactionIndex"] == receipt["transactionIndex"]
+        assert indexed["status"] == receipt["status"]
+        assert indexed["gasUsed"] == receipt["gasUsed"]
 
 
 def test_exception(mantra):
@@ -330,7 +355,7 @@ def test_message_call(mantra):
     assert elapsed < 5  # should finish in reasonable time
 
     receipt = send_transaction(w3, tx)
-    assert 22326250 == receipt.cumulativeGasUsed
+    assert_gas_used(f"TestMessageCall.test({iterations})", receipt.gasUsed)
     assert receipt.status == 1, "shouldn't fail"
     assert len(receipt.logs) == iterations
 
@@ -340,10 +365,8 @@ def test_log0(mantra):
     test compliance of empty topics behavior
     """
     w3 = mantra.w3
-    contract = deploy_contract(
-        w3,
-        CONTRACTS["TestERC20A"],
-    )
+    # test_log0 writes no storage, the shared instance is enough
+    contract = mantra.deployments.get("TestERC20A")
     tx = contract.functions.test_log0().build_transaction({"from": ADDRS["validator"]})
     receipt = send_transaction(w3, tx, KEYS["validator"])
     assert len(receipt.logs) == 1
@@ -381,12 +404,13 @@ def test_batch_tx(mantra):
     sender = ADDRS["validator"]
     recipient = ADDRS["community"]
     nonce = w3.eth.get_transaction_count(sender)
-    info = json.loads(CONTRACTS["TestERC20A"].read_text())
-    contract = w3.eth.contract(abi=info["abi"], bytecode=info["bytecode"])
-    deploy_tx = contract.constructor().build_transaction(
-        {"from": sender, "nonce": nonce}
+    artifact = ARTIFACTS["TestERC20A"]
+    deploy_tx = (
+        artifact.factory(w3)
+        .constructor()
+        .build_transaction({"from": sender, "nonce": nonce})
     )
-    contract = w3.eth.contract(address=contract_address(sender, nonce), abi=info["abi"])
+    contract = artifact.at(w3, contract_address(sender, nonce))
     transfer_tx1 = contract.functions.transfer(recipient, 1000).build_transaction(
         {"from": sender, "nonce": nonce + 1, "gas": 200000}
     )
@@ -394,14 +418,44 @@ def test_batch_tx(mantra):
         {"from": sender, "nonce": nonce + 2, "gas": 200000}
     )
 
-    cosmos_tx, tx_hashes = build_batch_tx(
-        w3, cli, [deploy_tx, transfer_tx1, transfer_tx2]
-    )
-    rsp = cli.broadcast_tx_json(cosmos_tx)
+    cosmos_tx, tx_hashes = build_batch_tx(w3, [deploy_tx, transfer_tx1, transfer_tx2])
+    rsp = cli.broadcast_tx_bytes(cosmos_tx)
     assert rsp["code"] == 18
     assert f"got {len(tx_hashes)}" in rsp["raw_log"]
 
 
+def test_build_evm_batch_tx():
+    "batch txs with hundreds of messages are built in process"
+    acct = ACCOUNTS["community"]
+    tx = {"to": acct.address, "value": 1, "gas": 21000, "nonce": 0, "chainId": 1}
+    raws = [
+        acct.sign_transaction(tx | {"gasPrice": 10}).raw_transaction,
+        acct.sign_transaction(
+            tx | {"maxFeePerGas": 10, "maxPriorityFeePerGas": 1}
+        ).raw_transaction,
+    ] * 250
+    start = time.perf_counter()
+    encoded = build_evm_batch_tx(raws, [acct.address] * len(raws))
+    # milliseconds, not a cli subprocess per msg
+    assert time.perf_counter() - start < 0.1
+    raw = TxRaw()
+    raw.ParseFromString(encoded)
+    body = TxBody()
+    body.ParseFromString(raw.body_bytes)
+    assert len(body.messages) == len(raws)
+    msg = MsgEthereumTx()
+    msg.ParseFromString(body.messages[1].value)
+    assert msg.raw == raws[1]
+    assert HexBytes(msg.from_) == HexBytes(acct.address)
+    auth_info = AuthInfo()
+    auth_info.ParseFromString(raw.auth_info_bytes)
+    assert auth_info.fee.gas_limit == 21000 * len(raws)
+    assert auth_info.fee.amount[0].amount == str(210000 * len(raws))
+    assert build_evm_batch_tx(raws[:2]) == build_evm_batch_tx(
+        raws[:2], [acct.address] * 2
+    )
+
+
 def test_refund_unused_gas_when_contract_tx_reverted(mantra):
     """
     Call a smart contract method that reverts with very high gas limit
@@ -458,9 +512,9 @@ def test_failed_transfer_tx(mantra):
         "value": half_balance,
     }
     cosmos_tx, tx_hashes = build_batch_tx(
-        w3, cli, [transfer1, transfer2, transfer3], KEYS["community"]
+        w3, [transfer1, transfer2, transfer3], KEYS["community"]
     )
-    rsp = cli.broadcast_tx_json(cosmos_tx)
+    rsp = cli.broadcast_tx_bytes(cosmos_tx)
     assert rsp["code"] == 0, rsp["raw_log"]
 
     receipts = [w3.eth.wait_for_transaction_receipt(h) for h in tx_hashes]
@@ -521,3 +575,24 @@ def test_textual(mantra):
         sign_mode="textual",
     )
     assert rsp["code"] == 0, rsp["raw_log"]
+
+
+def test_artifact_registry():
+    "artifacts are parsed once and share the memoized encoders"
+    artifact = ARTIFACTS["Greeter"]
+    assert load_artifact(CONTRACTS["Greeter"]) is artifact
+    assert artifact.selector("setGreeting") == abi.function_signature_to_4byte_selector(
+        "setGreeting(string)"
+    )
+    data = artifact.encode("setGreeting", "world")
+    assert data[:4] == artifact.selector("setGreeting")
+    assert artifact.fns.setGreeting.decode_input(data) == "world"
+    assert artifact.initcode() is artifact.initcode()
+    assert artifact.initcode() == HexBytes(artifact.bytecode)
+
+    w3 = web3.Web3()
+    assert artifact.factory(w3) is artifact.factory(w3)
+    erc20 = ARTIFACTS["TestERC20A"]
+    assert erc20.topic("Transfer") == web3.Web3.keccak(
+        text="Transfer(address,address,uint256)"
+    )
@@ -0,0 +1,1365 @@
+import asyncio
+import base64
+import contextlib
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from statistics import median
+from types import SimpleNamespace
+
+import pytest
+import requests
+import tomlkit
+import websockets
+from dateutil.parser import isoparse
+from py_ecc import bls12_381, bn128
+from pystarport import cluster, ports
+from web3 import Web3
+
+from .bench_utils import (
+    BlockWatcher,
+    LogWatcher,
+    process_cpu_time,
+    process_rss,
+    run_concurrently,
+    summarize,
+)
+from .cosmos_tx import build_evm_batch_tx
+from .ibc_utils import (
+    bulk_ibc_transfer,
+    packet_commitments,
+    prepare_network,
+    relayer_gas,
+)
+from .network import setup_custom_mantra
+from .utils import (
+    ACCOUNTS,
+    ADDRS,
+    CONTRACTS,
+    KEYS,
+    default_account_pool,
+    deploy_contract,
+    get_block_receipts,
+    send_raw_transactions,
+    sign_transaction,
+    w3_wait_for_block,
+)
+from .ws_utils import Client
+
+pytestmark = pytest.mark.benchmark
+
+SEED_SENDERS = ["validator", "community", "signer1", "signer2"]
+SEED_ROUNDS = 5
+# inner message calls per seeded tx, each one emits a log
+SEED_ITERATIONS = 10
+
+# json-rpc block-range-cap of the getLogs cluster, low enough for the chain to
+# grow past it during the test, the logs-cap is the default one
+LOGS_BLOCK_RANGE_CAP = int(os.getenv("LOGS_BLOCK_RANGE_CAP", 200))
+# log seeding, each round is a block with a tx per contract
+LOGS_SEED_ROUNDS = int(os.getenv("LOGS_SEED_ROUNDS", 30))
+LOGS_ITERATIONS = 100
+LOGS_REQUESTS = int(os.getenv("LOGS_REQUESTS", 20))
+TEST_EVENT_TOPIC = Web3.keccak(text="TestEvent(uint256)")
+# concurrent websocket subscribers, plus a slow one
+WS_SUBSCRIBERS = int(os.getenv("WS_SUBSCRIBERS", 10))
+WS_ROUNDS = 3
+WS_ITERATIONS = 1000
+# seconds the slow consumer spends on each message
+WS_SLOW_DELAY = 0.01
+WS_TIMEOUT = 120
+# mempool.max-txs of the default config
+MEMPOOL_MAX_TXS = 5000
+MEMPOOL_ACCOUNTS = int(os.getenv("MEMPOOL_ACCOUNTS", 100))
+# txs per account, in total past the mempool capacity
+MEMPOOL_TXS_PER_ACCOUNT = int(os.getenv("MEMPOOL_TXS_PER_ACCOUNT", 60))
+MEMPOOL_CONCURRENCY = int(os.getenv("MEMPOOL_CONCURRENCY", 32))
+# pool index of the first sender, away from the accounts of other tests
+MEMPOOL_POOL_START = 20000
+MEMPOOL_TIPS = [10**9, 2 * 10**9, 5 * 10**9, 10 * 10**9]
+MEMPOOL_DRAIN_TIMEOUT = 120
+# consensus block params to sweep, as comma separated `max_gas:max_bytes`
+BLOCK_PARAMS = [
+    tuple(int(v) for v in params.split(":"))
+    for params in os.getenv("BLOCK_PARAMS", "81500000:1048576").split(",")
+]
+# blocks to fill per workload
+FILL_BLOCKS = int(os.getenv("FILL_BLOCKS", 5))
+# max gas and calldata size of a single tx
+FILL_TX_GAS = 10000000
+FILL_TX_BYTES = 1000000
+# blocks of logs seeded before comparing the db backends
+DB_SEED_ROUNDS = int(os.getenv("DB_SEED_ROUNDS", 50))
+DB_REQUESTS = int(os.getenv("DB_REQUESTS", 100))
+# write stalls logged by goleveldb and pebble
+DB_STALL_PATTERNS = re.compile(r"write stall beginning|db@write was delayed")
+# snapshot intervals to sweep, comma separated
+STATESYNC_INTERVALS = [
+    int(v) for v in os.getenv("STATESYNC_INTERVALS", "5,20").split(",")
+]
+# state seeded before the snapshot
+STATE_ACCOUNTS = int(os.getenv("STATE_ACCOUNTS", 1000))
+STATE_STORAGE_TXS = int(os.getenv("STATE_STORAGE_TXS", 10))
+STATE_SLOTS_PER_TX = 400
+STATE_DENOMS = int(os.getenv("STATE_DENOMS", 5))
+STATE_POOL_START = 30000
+STATESYNC_TIMEOUT = 300
+# blocks produced while the lagging node is stopped
+CATCHUP_BLOCKS = int(os.getenv("CATCHUP_BLOCKS", 100))
+CATCHUP_TXS_PER_ROUND = int(os.getenv("CATCHUP_TXS_PER_ROUND", 40))
+CATCHUP_TIMEOUT = 600
+# bulk ibc transfers of each sender, sent concurrently
+IBC_SENDERS = ["community", "signer2"]
+IBC_TXS = int(os.getenv("IBC_TXS", 10))
+IBC_MSGS_PER_TX = int(os.getenv("IBC_MSGS_PER_TX", 50))
+IBC_TIMEOUT = 300
+# feehistory-cap of the default config
+FEE_HISTORY_CAP = 100
+FEE_HISTORY_PERCENTILES = list(range(0, 101, 2))
+# blocks of mixed priority transfers seeded before polling
+FEE_SEED_BLOCKS = int(os.getenv("FEE_SEED_BLOCKS", 20))
+FEE_TXS_PER_BLOCK = int(os.getenv("FEE_TXS_PER_BLOCK", 20))
+FEE_CONCURRENCY = int(os.getenv("FEE_CONCURRENCY", 64))
+# precompile input sizes, byte length of the modexp operands, pairs and points
+# 1024 byte operands cost more than the gas cap of eth_call
+MODEXP_SIZES = [32, 64, 128, 256, 512]
+PAIRING_COUNTS = [1, 2, 4, 8, 16]
+MULTIEXP_COUNTS = [1, 4, 16, 64, 128]
+PRECOMPILE_REQUESTS = int(os.getenv("PRECOMPILE_REQUESTS", 100))
+PRECOMPILE_CALL_GAS = 30000000
+TRACE_CONCURRENCY = int(os.getenv("TRACE_CONCURRENCY", 4))
+TRACERS = {
+    "callTracer": {"tracer": "callTracer"},
+    "prestateTracer": {"tracer": "prestateTracer"},
+    "structLogger": {},
+}
+
+METHODS = [
+    "eth_call",
+    "eth_getLogs",
+    "eth_feeHistory",
+    "debug_traceTransaction",
+    "eth_estimateGas",
+    "eth_getBlockByNumber",
+]
+
+
+def rpc(w3, method, params):
+    rsp = w3.provider.make_request(method, params)
+    assert "error" not in rsp, rsp["error"]
+    return rsp["result"]
+
+
+def seed_message_calls(w3, contracts, rounds, iterations):
+    """
+    call `test(iterations)` on each contract from a different sender per
+    round, return the receipts.
+    """
+    senders = SEED_SENDERS[: len(contracts)]
+    receipts = []
+    for _ in range(rounds):
+        raw_txs = [
+            sign_transaction(
+                w3,
+                {
+                    "to": contract.address,
+                    "data": contract.encode_abi("test", [iterations]),
+                },
+                KEYS[name],
+            ).raw_transaction
+            for name, contract in zip(senders, contracts)
+        ]
+        for txhash in send_raw_transactions(w3, raw_txs):
+            receipt = w3.eth.wait_for_transaction_receipt(txhash)
+            assert receipt.status == 1
+            receipts.append(receipt)
+    return receipts
+
+
+@pytest.fixture(scope="module")
+def seeded(mantra):
+    "blocks with message call txs emitting logs, and the params of each method"
+    w3 = mantra.w3
+    contract = mantra.deployments.get("TestMessageCall")
+    data = contract.encode_abi("test", [SEED_ITERATIONS])
+    receipts = seed_message_calls(
+        w3, [contract] * len(SEED_SENDERS), SEED_ROUNDS, SEED_ITERATIONS
+    )
+    start = min(r.blockNumber for r in receipts)
+    end = max(r.blockNumber for r in receipts)
+    busiest = max(
+        range(start, end + 1),
+        key=lambda n: sum(r.blockNumber == n for r in receipts),
+    )
+    call = {"from": ADDRS["validator"], "to": contract.address, "data": data}
+    return SimpleNamespace(
+        receipts=receipts,
+        params={
+            "eth_call": [call, "latest"],
+            "eth_getLogs": [
+                {
+                    "fromBlock": hex(start),
+                    "toBlock": hex(end),
+                    "address": contract.functions.inner().call(),
+                }
+            ],
+            "eth_feeHistory": [hex(100), "latest", [10, 50, 90]],
+            "debug_traceTransaction": [
+                Web3.to_hex(receipts[0].transactionHash),
+                {"tracer": "callTracer"},
+            ],
+            "eth_estimateGas": [call],
+            "eth_getBlockByNumber": [hex(busiest), True],
+        },
+    )
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_rpc_latency(mantra, seeded, benchmark_results, method):
+    w3 = mantra.w3
+    params = seeded.params[method]
+    result = run_concurrently(lambda: rpc(w3, method, params))
+    print(method, result)
+    regressions = benchmark_results.record(f"rpc/{method}", result)
+    assert not regressions, regressions
+
+
+def json_rpc_block_range_cap(cap):
+    "post init callback setting the json-rpc block-range-cap of each node"
+
+    def inner(path, base_port, config, genesis):
+        for file in (path / "mantra-canary-net-1").glob("node*/config/app.toml"):
+            doc = tomlkit.loads(file.read_text())
+            doc["json-rpc"]["block-range-cap"] = cap
+            file.write_text(tomlkit.dumps(doc))
+
+    return inner
+
+
+def json_rpc_caps(home):
+    "the getLogs block-range-cap and logs-cap of a node"
+    app = tomlkit.loads((home / "config/app.toml").read_text())
+    return int(app["json-rpc"]["block-range-cap"]), int(app["json-rpc"]["logs-cap"])
+
+
+@pytest.fixture(scope="module")
+def mantra_logs(tmp_path_factory):
+    path = tmp_path_factory.mktemp("get-logs")
+    yield from setup_custom_mantra(
+        path,
+        27500,
+        Path(__file__).parent / "configs/default.jsonnet",
+        post_init=json_rpc_block_range_cap(LOGS_BLOCK_RANGE_CAP),
+    )
+
+
+@pytest.fixture(scope="module")
+def log_blocks(mantra_logs):
+    """
+    blocks of logs emitted by the inner contracts of a TestMessageCall per
+    sender, the log count is indexed by (block, address).
+    """
+    w3 = mantra_logs.w3
+    contracts = [
+        deploy_contract(w3, CONTRACTS["TestMessageCall"]) for _ in SEED_SENDERS
+    ]
+    inners = {c.address: c.functions.inner().call() for c in contracts}
+    receipts = seed_message_calls(w3, contracts, LOGS_SEED_ROUNDS, LOGS_ITERATIONS)
+    counts = {}
+    for receipt in receipts:
+        key = (receipt.blockNumber, inners[receipt.to])
+        counts[key] = counts.get(key, 0) + len(receipt.logs)
+    return SimpleNamespace(
+        addresses=list(inners.values()),
+        start=min(r.blockNumber for r in receipts),
+        end=max(r.blockNumber for r in receipts),
+        counts=counts,
+    )
+
+
+def test_get_logs_range_scan(mantra_logs, log_blocks, benchmark_results):
+    """
+    getLogs latency, response size and node memory as the block range, the
+    address count and the topic filter vary. the ranges end at the latest block
+    and extend over the empty blocks up to and past the block-range-cap read
+    from app.toml, the queries over the block-range-cap or the logs-cap must
+    return an error.
+    """
+    range_cap, logs_cap = json_rpc_caps(mantra_logs.node_home(0))
+    # the node rejects a to - from distance over the cap, the widest range
+    # starts past the genesis block
+    w3_wait_for_block(mantra_logs.w3, range_cap + 2, timeout=range_cap * 5)
+    latest = mantra_logs.w3.eth.block_number
+    endpoint = mantra_logs.w3_http_endpoint()
+    pid = mantra_logs.node_pid()
+    seeded = latest - log_blocks.start + 1
+    widths = {w for w in (1, 10, 100, 1000) if w <= range_cap}
+    widths = sorted(widths | {seeded, range_cap + 1, range_cap + 2})
+    address_counts = [1, 2, len(log_blocks.addresses)]
+    topic_filters = {"any": None, "event": [Web3.to_hex(TEST_EVENT_TOPIC)]}
+    regressions = []
+    for width, n, (topic_name, topics) in itertools.product(
+        widths, address_counts, topic_filters.items()
+    ):
+        addresses = log_blocks.addresses[:n]
+        start = latest - width + 1
+        expected = sum(
+            count
+            for (height, address), count in log_blocks.counts.items()
+            if start <= height and address in addresses
+        )
+        over_cap = width - 1 > range_cap or expected > logs_cap
+        flt = {"fromBlock": hex(start), "toBlock": hex(latest)}
+        flt |= {"address": addresses, "topics": topics}
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "eth_getLogs"}
+        payload["params"] = [flt]
+        name = f"get_logs/width{width}/addresses{n}/topics-{topic_name}"
+
+        rsp = requests.post(endpoint, json=payload)
+        result = rsp.json()
+        if over_cap:
+            assert "error" in result, (name, expected)
+            capped = result["error"]["message"]
+            print(f"{name}: capped by node, {capped}")
+            benchmark_results.record(name, {"logs": expected, "capped": capped})
+            continue
+        assert "error" not in result, (name, result["error"])
+        assert len(result["result"]) == expected, name
+        capped = None
+        if expected == logs_cap:
+            capped = f"returned exactly logs-cap {logs_cap} logs"
+
+        rss = process_rss(pid)
+        stats = run_concurrently(
+            lambda: requests.post(endpoint, json=payload).raise_for_status(),
+            total=LOGS_REQUESTS,
+        )
+        after = process_rss(pid)
+        stats |= {
+            "logs": expected,
+            "bytes": len(rsp.content),
+            "rss": after,
+            "rss_delta": after - rss,
+            "capped": capped,
+        }
+        print(name, stats)
+        regressions += benchmark_results.record(name, stats)
+    assert not regressions, regressions
+
+
+def test_subscription_throughput(mantra, benchmark_results):
+    """
+    messages per second and latency since the block time, or the submit time
+    for pending txs, of each subscription type with many subscribers, and how
+    far a slow consumer falls behind.
+    """
+    w3 = mantra.w3
+    contract = mantra.deployments.get("TestMessageCall")
+    inner = contract.functions.inner().call()
+    data = contract.encode_abi("test", [WS_ITERATIONS])
+    kinds = {
+        "newHeads": (),
+        "logs": ({"address": inner},),
+        "newPendingTransactions": (),
+    }
+
+    def send_rounds():
+        submits, receipts = {}, []
+        for _ in range(WS_ROUNDS):
+            raw_txs = [
+                sign_transaction(
+                    w3, {"to": contract.address, "data": data}, KEYS[name]
+                ).raw_transaction
+                for name in SEED_SENDERS
+            ]
+            submit = time.time()
+            for txhash in send_raw_transactions(w3, raw_txs):
+                submits[Web3.to_hex(txhash)] = submit
+                receipts.append(w3.eth.wait_for_transaction_receipt(txhash))
+        return submits, receipts
+
+    async def run():
+        async with contextlib.AsyncExitStack() as stack:
+            clients = []
+            for delay in [0] * WS_SUBSCRIBERS + [WS_SLOW_DELAY]:
+                ws = await stack.enter_async_context(
+                    websockets.connect(mantra.w3_ws_endpoint())
+                )
+                clients.append(Client(ws, delay))
+            tasks = [asyncio.create_task(c.receive_loop()) for c in clients]
+            counters = {kind: [] for kind in kinds}
+            for c in clients[:-1]:
+                for kind, args in kinds.items():
+                    _, counter = await c.subscribe_counter(kind, *args)
+                    counters[kind].append(counter)
+            _, slow = await clients[-1].subscribe_counter("logs", {"address": inner})
+
+            loop = asyncio.get_running_loop()
+            submits, receipts = await loop.run_in_executor(None, send_rounds)
+            expected = sum(len(r.logs) for r in receipts)
+            deadline = time.time() + WS_TIMEOUT
+            while time.time() < deadline and any(
+                c.count < expected for c in counters["logs"]
+            ):
+                await asyncio.sleep(0.1)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return counters, slow, clients[-1].closed, submits, receipts, expected
+
+    counters, slow, closed, submits, receipts, expected = asyncio.run(run())
+    heights = {int(h) for c in counters["newHeads"] for h in c.arrivals}
+    heights |= {r.blockNumber for r in receipts}
+    origins = {h: w3.eth.get_block(h).timestamp for h in heights}
+    origins |= submits
+
+    regressions = []
+    for kind, kind_counters in counters.items():
+        assert all(c.count > 0 for c in kind_counters), kind
+        rates = [c.rate() for c in kind_counters if c.rate() is not None]
+        latencies = [lat for c in kind_counters for lat in c.latencies(origins)]
+        stats = summarize(latencies) | {
+            "subscribers": len(kind_counters),
+            "messages": sum(c.count for c in kind_counters),
+            "throughput": sum(rates),
+        }
+        print(kind, stats)
+        regressions += benchmark_results.record(f"ws/{kind}", stats)
+    assert all(c.count == expected for c in counters["logs"])
+
+    fast_last = max(c.last for c in counters["logs"])
+    stats = {
+        "expected": expected,
+        "received": slow.count,
+        "lag": None if slow.last is None else slow.last - fast_last,
+        "closed": None if closed is None else str(closed),
+    }
+    print("slow consumer", stats)
+    benchmark_results.record("ws/slow_consumer", stats)
+    assert not regressions, regressions
+
+
+@pytest.mark.parametrize("tracer", TRACERS)
+def test_trace_replay(mantra, seeded, benchmark_results, tracer):
+    """
+    replay debug_traceBlockByNumber over the seeded blocks at a configurable
+    concurrency, measure the latency, response size and node RSS.
+    """
+    endpoint = mantra.w3_http_endpoint()
+    pid = mantra.node_pid()
+    heights = sorted({r.blockNumber for r in seeded.receipts})
+    config = TRACERS[tracer]
+    blocks = itertools.cycle(heights)
+    lock = threading.Lock()
+    sizes = []
+
+    def trace():
+        with lock:
+            height = next(blocks)
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "debug_traceBlockByNumber"}
+        payload["params"] = [hex(height), config]
+        rsp = requests.post(endpoint, json=payload)
+        assert "error" not in rsp.json(), rsp.text
+        sizes.append(len(rsp.content))
+
+    rss = process_rss(pid)
+    stats = run_concurrently(trace, concurrency=TRACE_CONCURRENCY)
+    after = process_rss(pid)
+    stats |= {
+        "bytes": summarize(sizes),
+        "rss": after,
+        "rss_delta": after - rss,
+    }
+    print(tracer, stats)
+    regressions = benchmark_results.record(f"trace/{tracer}", stats)
+    assert not regressions, regressions
+
+
+def mixed_nonce_txs(accounts, count, fee, chain_id):
+    """
+    sign `count` transfers per account with a random priority tip each, the
+    nonces of an account are sent mostly in order, with some adjacent pairs
+    swapped, and the accounts are interleaved.
+    """
+    rnd = random.Random(0)
+    per_account = []
+    for acct in accounts:
+        nonces = list(range(count))
+        for i in range(0, count - 1, 2):
+            if rnd.random() < 0.2:
+                nonces[i], nonces[i + 1] = nonces[i + 1], nonces[i]
+        txs = []
+        for nonce in nonces:
+            tip = rnd.choice(MEMPOOL_TIPS)
+            tx = {
+                "to": ADDRS["community"],
+                "value": 1,
+                "gas": 21000,
+                "maxFeePerGas": fee + tip,
+                "maxPriorityFeePerGas": tip,
+                "nonce": nonce,
+                "chainId": chain_id,
+            }
+            raw = acct.sign_transaction(tx).raw_transaction
+            txs.append(build_evm_batch_tx([raw], [acct.address]))
+        per_account.append(txs)
+    return [tx for txs in itertools.zip_longest(*per_account) for tx in txs if tx]
+
+
+@pytest.mark.asyncio
+async def test_mempool_saturation(mantra, benchmark_results):
+    """
+    burst txs from many accounts past mempool.max-txs, measure the admission
+    rate, the rejection codes, the time to drain and a per block time series
+    of the mempool size, the admitted and rejected txs and the CheckTx
+    latency of a probe right after the block, which waits for the recheck.
+    """
+    w3 = mantra.w3
+    cli = mantra.cosmos_cli()
+    fee = w3.eth.gas_price * 2
+    amount = MEMPOOL_TXS_PER_ACCOUNT * (21000 * (fee + max(MEMPOOL_TIPS)) + 1)
+    accounts = await default_account_pool().fund(
+        mantra.async_w3,
+        ACCOUNTS["community"],
+        MEMPOOL_ACCOUNTS,
+        amount,
+        start=MEMPOOL_POOL_START,
+    )
+    txs = mixed_nonce_txs(accounts, MEMPOOL_TXS_PER_ACCOUNT, fee, w3.eth.chain_id)
+
+    lock = threading.Lock()
+    admitted, acks, rejections, samples = [], [], Counter(), {}
+    series = []
+    stop = threading.Event()
+
+    def send(tx):
+        start = time.monotonic()
+        rsp = cli.broadcast_tx_bytes(tx, wait=False, check=False)
+        ack = time.monotonic()
+        with lock:
+            acks.append(ack - start)
+            if rsp["code"] == 0:
+                admitted.append(ack)
+            else:
+                code = f"{rsp['codespace']}:{rsp['code']}"
+                if rsp["codespace"] == "rpc":
+                    # mempool full, tx in cache, etc. share the rpc error code
+                    code += ":" + rsp["raw_log"].split(":")[0]
+                rejections[code] += 1
+                samples.setdefault(code, rsp["raw_log"])
+
+    def monitor():
+        height = w3.eth.block_number
+        counts = (0, 0)
+        while not stop.wait(0.05):
+            latest = w3.eth.block_number
+            if latest == height:
+                continue
+            now = time.monotonic()
+            # CheckTx waits for the mempool update and recheck of the new block
+            cli.broadcast_tx_bytes(os.urandom(64), wait=False, check=False)
+            recheck = time.monotonic() - now
+            with lock:
+                current = (len(admitted), sum(rejections.values()))
+            series.append(
+                {
+                    "height": latest,
+                    "time": now,
+                    "txs": w3.eth.get_block_transaction_count(latest),
+                    "mempool": cli.num_unconfirmed_txs(),
+                    "admitted": current[0] - counts[0],
+                    "rejected": current[1] - counts[1],
+                    "recheck": recheck,
+                }
+            )
+            height, counts = latest, current
+
+    def saturate():
+        thread = threading.Thread(target=monitor, daemon=True)
+        thread.start()
+        start = time.monotonic()
+        with ThreadPoolExecutor(MEMPOOL_CONCURRENCY) as executor:
+            list(executor.map(send, txs))
+        sent = time.monotonic()
+        deadline = sent + MEMPOOL_DRAIN_TIMEOUT
+        while cli.num_unconfirmed_txs() > 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        drained = time.monotonic()
+        stop.set()
+        thread.join()
+        return start, sent, drained
+
+    loop = asyncio.get_running_loop()
+    start, sent, drained = await loop.run_in_executor(None, saturate)
+    for point in series:
+        point["time"] -= start
+    stats = summarize(acks) | {
+        "submitted": len(txs),
+        "admitted": len(admitted),
+        "throughput": len(admitted) / (sent - start),
+        "rejections": dict(rejections),
+        "rejection_samples": samples,
+        "drain_time": drained - sent,
+        "recheck": summarize(point["recheck"] for point in series),
+        "blocks": series,
+    }
+    for point in series:
+        print(point)
+    print({k: v for k, v in stats.items() if k != "blocks"})
+    regressions = benchmark_results.record("mempool/saturation", stats)
+    assert admitted
+    assert cli.num_unconfirmed_txs() == 0, "mempool is not drained"
+    assert max((p["mempool"] for p in series), default=0) <= MEMPOOL_MAX_TXS
+    assert not regressions, regressions
+
+
+def consensus_block_params(max_gas, max_bytes):
+    "post init callback overriding the block params in the genesis of each node"
+
+    def inner(path, base_port, config, genesis):
+        for file in (path / "mantra-canary-net-1").glob("node*/config/genesis.json"):
+            doc = json.loads(file.read_text())
+            doc["consensus"]["params"]["block"] |= {
+                "max_gas": str(max_gas),
+                "max_bytes": str(max_bytes),
+            }
+            file.write_text(json.dumps(doc))
+
+    return inner
+
+
+@pytest.fixture(
+    scope="module", params=BLOCK_PARAMS, ids=lambda p: f"gas{p[0]}-bytes{p[1]}"
+)
+def mantra_block(request, tmp_path_factory):
+    max_gas, max_bytes = request.param
+    path = tmp_path_factory.mktemp("block-fill")
+    for c in setup_custom_mantra(
+        path,
+        27200,
+        Path(__file__).parent / "configs/default.jsonnet",
+        post_init=consensus_block_params(max_gas, max_bytes),
+    ):
+        yield SimpleNamespace(cluster=c, max_gas=max_gas, max_bytes=max_bytes)
+
+
+def block_fill_txs(w3, contract, max_gas, max_bytes):
+    """
+    the unsigned txs of each workload, enough to fill `FILL_BLOCKS` blocks to
+    the gas limit, or to the byte limit for the large calldata.
+    """
+    sender = ADDRS["validator"]
+    tx_gas = min(FILL_TX_GAS, max_gas // 8)
+    burn = contract["BurnGas"].functions.burnGas
+    # each push is a fresh storage slot, ~22k gas
+    count = tx_gas // 23000
+    burn_tx = burn(count).build_transaction({"from": sender})
+    call = contract["TestMessageCall"].functions.test
+    call_tx = call(tx_gas // 2000).build_transaction({"from": sender})
+    size = min(FILL_TX_BYTES, max_bytes // 4)
+    calldata_tx = {"from": sender, "to": ADDRS["community"], "data": "0x" + "00" * size}
+    calldata_tx["gas"] = w3.eth.estimate_gas(calldata_tx)
+    workloads = {}
+    for name, tx in [
+        ("burn_gas", burn_tx),
+        ("message_call", call_tx),
+        ("calldata", calldata_tx),
+    ]:
+        if name == "calldata":
+            total = FILL_BLOCKS * (max_bytes // size)
+        else:
+            total = FILL_BLOCKS * max_gas // tx["gas"] + 1
+        tx = {k: v for k, v in tx.items() if k != "from"}
+        workloads[name] = [dict(tx) for _ in range(total)]
+    return workloads
+
+
+def send_from_senders(w3, txs):
+    "sign the txs round robin across the seed senders with local nonces, send all"
+    nonces = {name: w3.eth.get_transaction_count(ADDRS[name]) for name in SEED_SENDERS}
+    raw_txs = []
+    for i, tx in enumerate(txs):
+        name = SEED_SENDERS[i % len(SEED_SENDERS)]
+        tx = tx | {"nonce": nonces[name]}
+        nonces[name] += 1
+        raw_txs.append(sign_transaction(w3, tx, KEYS[name]).raw_transaction)
+    return [
+        w3.eth.wait_for_transaction_receipt(txhash, timeout=240)
+        for txhash in send_raw_transactions(w3, raw_txs)
+    ]
+
+
+@pytest.mark.parametrize("workload", ["burn_gas", "message_call", "calldata"])
+def test_block_fill(mantra_block, benchmark_results, workload):
+    """
+    pack blocks to the gas limit with storage writes or message calls, or to
+    the byte limit with large calldata, report the gas/sec and bytes/sec, the
+    block interval stretch against idle blocks and the commit time per block,
+    from the header time to the block being seen on the json-rpc.
+    """
+    c = mantra_block.cluster
+    w3 = c.w3
+    cli = c.cosmos_cli()
+    # burnGas grows the storage of the contract, a fresh instance keeps the
+    # state written by earlier tests out of the measure
+    contract = {
+        "BurnGas": deploy_contract(w3, CONTRACTS["BurnGas"]),
+        "TestMessageCall": c.deployments.get("TestMessageCall"),
+    }
+
+    def header_time(height):
+        return isoparse(cli.rpc_block(height)["header"]["time"]).timestamp()
+
+    latest = w3.eth.block_number
+    idle = [header_time(h) for h in range(max(1, latest - 10), latest + 1)]
+    idle_interval = median(b - a for a, b in zip(idle, idle[1:]))
+
+    txs = block_fill_txs(w3, contract, mantra_block.max_gas, mantra_block.max_bytes)
+    with BlockWatcher(w3) as watcher:
+        receipts = send_from_senders(w3, txs[workload])
+    assert all(r.status == 1 for r in receipts)
+
+    start = min(r.blockNumber for r in receipts)
+    end = max(r.blockNumber for r in receipts)
+    series = []
+    prev = header_time(start - 1)
+    for height in range(start, end + 1):
+        block = cli.rpc_block(height)
+        t = isoparse(block["header"]["time"]).timestamp()
+        gas_used = w3.eth.get_block(height).gasUsed
+        size = sum(len(base64.b64decode(tx)) for tx in block["data"]["txs"] or [])
+        seen = watcher.seen.get(height)
+        series.append(
+            {
+                "height": height,
+                "interval": t - prev,
+                "gas_used": gas_used,
+                "gas_fill": gas_used / mantra_block.max_gas,
+                "bytes": size,
+                "bytes_fill": size / mantra_block.max_bytes,
+                "commit": None if seen is None else seen - t,
+            }
+        )
+        prev = t
+    elapsed = sum(point["interval"] for point in series)
+    gas_per_sec = sum(point["gas_used"] for point in series) / elapsed
+    bytes_per_sec = sum(point["bytes"] for point in series) / elapsed
+    stats = summarize(point["commit"] for point in series) | {
+        "gas_per_sec": gas_per_sec,
+        "bytes_per_sec": bytes_per_sec,
+        "throughput": bytes_per_sec if workload == "calldata" else gas_per_sec,
+        "idle_interval": idle_interval,
+        "stretch": median(point["interval"] for point in series) / idle_interval,
+        "blocks": series,
+    }
+    for point in series:
+        print(point)
+    print({k: v for k, v in stats.items() if k != "blocks"})
+    name = (
+        f"block_fill/{workload}/"
+        f"gas{mantra_block.max_gas}-bytes{mantra_block.max_bytes}"
+    )
+    regressions = benchmark_results.record(name, stats)
+    assert max(point["gas_used"] for point in series) <= mantra_block.max_gas
+    assert not regressions, regressions
+
+
+def db_backend(home):
+    "the cometbft and app db backends of a node"
+    config = tomlkit.loads((home / "config/config.toml").read_text())
+    app = tomlkit.loads((home / "config/app.toml").read_text())
+    return f"{config['db_backend']}/{app.get('app-db-backend') or 'default'}"
+
+
+def disk_usage(path):
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def db_stalls(home, log):
+    "write stalls in the db engine logs under the data dir and the node log"
+    files = [f for f in (home / "data").rglob("LOG*") if f.is_file()]
+    if log.exists():
+        files.append(log)
+    return sum(
+        len(DB_STALL_PATTERNS.findall(f.read_text(errors="ignore"))) for f in files
+    )
+
+
+def test_db_backends(mantra, benchmark_results, tmp_path):
+    """
+    run the same workload on the nodes of different db backends, then compare
+    the latency of historic queries, getLogs and traces, the disk growth per
+    1000 blocks and the write stalls, the report is written to
+    `$DB_BENCH_REPORT` or the test's tmp path.
+    """
+    w3 = mantra.w3
+    n = len(mantra.config["validators"])
+    homes = [mantra.node_home(i) for i in range(n)]
+    logs = [mantra.base_dir / f"node{i}.log" for i in range(n)]
+    before = [
+        (disk_usage(h / "data"), db_stalls(h, log)) for h, log in zip(homes, logs)
+    ]
+    height = w3.eth.block_number
+
+    contract = mantra.deployments.get("TestMessageCall")
+    receipts = seed_message_calls(
+        w3, [contract] * len(SEED_SENDERS), DB_SEED_ROUNDS, SEED_ITERATIONS
+    )
+    start = min(r.blockNumber for r in receipts)
+    end = max(r.blockNumber for r in receipts)
+    latest = max(w3.eth.block_number, end)
+    inner = contract.functions.inner().call()
+    call = {"to": contract.address, "data": contract.encode_abi("inner", [])}
+    txhashes = [Web3.to_hex(r.transactionHash) for r in receipts]
+    rnd = random.Random(0)
+    queries = {
+        "historic_balance": lambda: (
+            "eth_getBalance",
+            [ADDRS["validator"], hex(rnd.randint(start, end))],
+        ),
+        "historic_call": lambda: ("eth_call", [call, hex(rnd.randint(start, end))]),
+        "get_logs": lambda: (
+            "eth_getLogs",
+            [{"fromBlock": hex(start), "toBlock": hex(end), "address": inner}],
+        ),
+        "trace": lambda: (
+            "debug_traceTransaction",
+            [rnd.choice(txhashes), {"tracer": "callTracer"}],
+        ),
+    }
+
+    report = {}
+    regressions = []
+    for i, (home, log) in enumerate(zip(homes, logs)):
+        node_w3 = mantra.node_w3(i)
+        w3_wait_for_block(node_w3, latest)
+        backend = db_backend(home)
+        node = {"backend": backend}
+        for name, query in queries.items():
+            stats = run_concurrently(lambda: rpc(node_w3, *query()), total=DB_REQUESTS)
+            node[name] = stats
+            regressions += benchmark_results.record(f"db/{backend}/{name}", stats)
+        size, stalls = disk_usage(home / "data"), db_stalls(home, log)
+        blocks = node_w3.eth.block_number - height
+        node |= {
+            "disk": size,
+            "disk_growth_per_1000_blocks": (size - before[i][0]) * 1000 / blocks,
+            "stalls": stalls - before[i][1],
+        }
+        report[f"node{i}"] = node
+
+    path = Path(os.getenv("DB_BENCH_REPORT") or tmp_path / "db_backends.json")
+    path.write_text(json.dumps(report, indent=2))
+    print("db backends report:", path)
+    for node, result in report.items():
+        print(
+            node,
+            result["backend"],
+            *(f"{name} p95={result[name]['p95']:.4f}s" for name in queries),
+            f"growth/1000 blocks={result['disk_growth_per_1000_blocks']:.0f}B",
+            f"stalls={result['stalls']}",
+        )
+    assert not regressions, regressions
+
+
+def snapshot_interval(interval):
+    "post init callback setting the state sync snapshot interval of each node"
+
+    def inner(path, base_port, config, genesis):
+        for file in (path / "mantra-canary-net-1").glob("node*/config/app.toml"):
+            doc = tomlkit.loads(file.read_text())
+            doc["state-sync"]["snapshot-interval"] = interval
+            doc["state-sync"]["snapshot-keep-recent"] = 2
+            file.write_text(tomlkit.dumps(doc))
+
+    return inner
+
+
+@pytest.fixture(scope="module", params=STATESYNC_INTERVALS, ids=str)
+def mantra_snapshot(request, tmp_path_factory):
+    path = tmp_path_factory.mktemp("statesync")
+    for c in setup_custom_mantra(
+        path,
+        27300,
+        Path(__file__).parent / "configs/default.jsonnet",
+        post_init=snapshot_interval(request.param),
+    ):
+        yield SimpleNamespace(cluster=c, interval=request.param)
+
+
+def seed_state(c, label):
+    "accounts, contract storage slots and tokenfactory denoms"
+    w3 = c.w3
+    cli = c.cosmos_cli()
+    asyncio.run(
+        default_account_pool().fund(
+            c.async_w3,
+            ACCOUNTS["community"],
+            STATE_ACCOUNTS,
+            10**15,
+            start=STATE_POOL_START,
+        )
+    )
+    burn = deploy_contract(w3, CONTRACTS["BurnGas"]).functions.burnGas(
+        STATE_SLOTS_PER_TX
+    )
+    txs = [burn.build_transaction({"from": ADDRS["validator"]})] * STATE_STORAGE_TXS
+    assert all(r.status == 1 for r in send_from_senders(w3, txs))
+    creator = cli.address("community")
+    for i in range(STATE_DENOMS):
+        rsp = cli.create_tokenfactory_denom(f"{label}x{i}", _from=creator, gas=620000)
+        assert rsp["code"] == 0, rsp["raw_log"]
+
+
+def test_statesync_time_to_ready(mantra_snapshot, benchmark_results):
+    """
+    seed state, then measure the snapshot creation time and size, the chunk
+    fetch and apply rates of a new state sync node from its log, and the wall
+    time until it serves the json-rpc, per snapshot interval.
+    """
+    c = mantra_snapshot.cluster
+    interval = mantra_snapshot.interval
+    w3 = c.w3
+    cli = c.cosmos_cli()
+    seed_state(c, f"ss{interval}")
+
+    # the next snapshot after the seeded state, from the node log since the
+    # snapshot db is locked by the running node
+    height = (w3.eth.block_number // interval + 1) * interval
+    pattern = rf"completed state snapshot.*height\W+{height}\b"
+    with (
+        BlockWatcher(w3) as watcher,
+        LogWatcher(c.base_dir / "node0.log", {"created": pattern}) as snapshot_log,
+    ):
+        deadline = time.time() + STATESYNC_TIMEOUT
+        while not snapshot_log.events["created"]:
+            assert time.time() < deadline, f"no snapshot at {height}"
+            time.sleep(0.2)
+    created = snapshot_log.events["created"][0]
+    seen = (
+        watcher.seen.get(height)
+        or isoparse(cli.rpc_block(height)["header"]["time"]).timestamp()
+    )
+    # data/snapshots/<height>/<format>/<chunk>
+    snapshot_dir = c.node_home(0) / "data/snapshots" / str(height)
+    size = disk_usage(snapshot_dir)
+    chunks = sum(1 for f in snapshot_dir.glob("*/*") if f.is_file())
+
+    clustercli = cluster.ClusterCLI(
+        c.base_dir.parent, cmd="mantrachaind", chain_id=c.config["chain_id"]
+    )
+    i = clustercli.create_node(moniker=f"statesync{interval}", statesync=True)
+    cluster.edit_app_cfg(
+        clustercli.home(i) / "config/app.toml",
+        clustercli.base_port(i),
+        {
+            "json-rpc": {
+                "enable": True,
+                "address": "127.0.0.1:{EVMRPC_PORT}",
+                "ws-address": "127.0.0.1:{EVMRPC_PORT_WS}",
+            },
+        },
+    )
+    process = f"{clustercli.chain_id}-node{i}"
+    statesync_w3 = Web3(
+        Web3.HTTPProvider(
+            f"http://127.0.0.1:{ports.evmrpc_port(clustercli.base_port(i))}"
+        )
+    )
+    patterns = {
+        "fetch": r"Fetching snapshot chunk",
+        "apply": r"Applied snapshot chunk",
+        "restored": r"Snapshot restored",
+    }
+    with LogWatcher(c.base_dir / f"node{i}.log", patterns) as log:
+        start = time.time()
+        clustercli.supervisor.startProcess(process)
+        while True:
+            try:
+                if statesync_w3.eth.block_number >= height:
+                    break
+            except requests.exceptions.ConnectionError:
+                pass
+            assert time.time() - start < STATESYNC_TIMEOUT, "state sync timeout"
+            time.sleep(0.2)
+        ready = time.time()
+    clustercli.supervisor.stopProcess(process)
+
+    applied = log.events["apply"]
+    stats = {
+        "height": height,
+        "snapshot_creation": created - seen,
+        "snapshot_bytes": size,
+        "chunks": chunks,
+        "fetch_rate": log.rate("fetch"),
+        "apply_rate": log.rate("apply"),
+        "apply_bytes_per_sec": (
+            size / (applied[-1] - start) if size and applied else None
+        ),
+        "restored": (
+            log.events["restored"][0] - start if log.events["restored"] else None
+        ),
+        "time_to_ready": ready - start,
+    }
+    print(f"snapshot interval {interval}", stats)
+    benchmark_results.record(f"statesync/interval{interval}", stats)
+    assert applied, "no snapshot chunk applied"
+
+
+def rpc_height(base_port):
+    "latest height of a node from the CometBFT rpc"
+    rsp = requests.get(f"http://127.0.0.1:{ports.rpc_port(base_port)}/status")
+    return int(rsp.json()["result"]["sync_info"]["latest_block_height"])
+
+
+def test_block_sync_catch_up(mantra, benchmark_results):
+    """
+    stop a full node with the supervisor xml-rpc, produce loaded blocks, then
+    restart it and measure the blocks/sec and tx/sec replayed until it catches
+    up, with its cpu usage and RSS sampled along the way.
+
+    the validators have equal power, so a lagging full node is added instead
+    of stopping a validator, which would halt the chain.
+    """
+    w3 = mantra.w3
+    clustercli = cluster.ClusterCLI(
+        mantra.base_dir.parent, cmd="mantrachaind", chain_id=mantra.config["chain_id"]
+    )
+    i = clustercli.create_node(moniker="catchup")
+    process = f"{clustercli.chain_id}-node{i}"
+    base_port = clustercli.base_port(i)
+    supervisor = clustercli.supervisor
+
+    def wait_height(target, timeout):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                if rpc_height(base_port) >= target:
+                    return
+            except requests.exceptions.ConnectionError:
+                pass
+            assert time.time() < deadline, f"node{i} not at {target}"
+            time.sleep(0.2)
+
+    supervisor.startProcess(process)
+    wait_height(w3.eth.block_number, CATCHUP_TIMEOUT)
+    supervisor.stopProcess(process)
+    start = rpc_height(mantra.base_port(0))
+
+    transfer = {"to": ADDRS["community"], "value": 1, "gas": 21000}
+    while w3.eth.block_number < start + CATCHUP_BLOCKS:
+        send_from_senders(w3, [transfer] * CATCHUP_TXS_PER_ROUND)
+    target = w3.eth.block_number
+    txs = sum(
+        w3.eth.get_block_transaction_count(h) for h in range(start + 1, target + 1)
+    )
+
+    begin = time.time()
+    supervisor.startProcess(process)
+    pid = supervisor.getProcessInfo(process)["pid"]
+    samples = []
+    cpu, t = process_cpu_time(pid), begin
+    deadline = begin + CATCHUP_TIMEOUT
+    while True:
+        try:
+            height = rpc_height(base_port)
+        except requests.exceptions.ConnectionError:
+            height = None
+        now, used = time.time(), process_cpu_time(pid)
+        samples.append(
+            {
+                "time": now - begin,
+                "height": height,
+                "cpu": (used - cpu) / (now - t),
+                "rss": process_rss(pid),
+            }
+        )
+        cpu, t = used, now
+        if height is not None and height >= target:
+            break
+        assert now < deadline, f"node{i} not caught up to {target}"
+        time.sleep(0.5)
+    elapsed = time.time() - begin
+    supervisor.stopProcess(process)
+
+    stats = {
+        "blocks": target - start,
+        "txs": txs,
+        "elapsed": elapsed,
+        "blocks_per_sec": (target - start) / elapsed,
+        "throughput": txs / elapsed,
+        "cpu": summarize(s["cpu"] for s in samples),
+        "rss": summarize(s["rss"] for s in samples),
+        "samples": samples,
+    }
+    print({k: v for k, v in stats.items() if k != "samples"})
+    regressions = benchmark_results.record("catch_up", stats)
+    assert not regressions, regressions
+
+
+@pytest.fixture(
+    scope="module", params=[cluster.Relayer.HERMES.value, cluster.Relayer.RLY.value]
+)
+def ibc_relayer(request, tmp_path_factory):
+    path = tmp_path_factory.mktemp(f"ibc-{request.param}")
+    for ibc in prepare_network(path, "ibc", relayer=request.param):
+        yield SimpleNamespace(network=ibc, relayer=request.param)
+
+
+def test_ibc_relay_throughput(ibc_relayer, benchmark_results):
+    """
+    send bulk ibc transfers, many messages per tx from concurrent senders,
+    measure the latency from the send block time to the ack, the sustained
+    packets/sec and the gas spent by the relayer on both chains.
+    """
+    ibc = ibc_relayer.network
+    cli1, cli2 = ibc.ibc1.cosmos_cli(), ibc.ibc2.cosmos_cli()
+    receiver = cli2.address("community")
+    # the relayer keys of each chain
+    relayers = [cli1.address("signer1"), cli2.address("signer2")]
+    heights = [cli1.block_height(), cli2.block_height()]
+    sends, acks = {}, {}
+    stop = threading.Event()
+
+    def poll_acks():
+        while not stop.wait(0.2):
+            # the packets sent before the query, acked if no longer committed
+            sent = set(sends)
+            pending = packet_commitments(ibc)
+            now = time.time()
+            for seq in sent - pending:
+                acks.setdefault(seq, now)
+
+    def send(name):
+        sender = cli1.address(name)
+        for _ in range(IBC_TXS):
+            rsp, sequences = bulk_ibc_transfer(
+                cli1, sender, receiver, "1uom", IBC_MSGS_PER_TX
+            )
+            sent = isoparse(rsp["timestamp"]).timestamp()
+            for seq in sequences:
+                sends[seq] = sent
+
+    poller = threading.Thread(target=poll_acks, daemon=True)
+    poller.start()
+    with ThreadPoolExecutor(len(IBC_SENDERS)) as executor:
+        list(executor.map(send, IBC_SENDERS))
+    deadline = time.time() + IBC_TIMEOUT
+    while len(acks) < len(sends) and time.time() < deadline:
+        time.sleep(0.5)
+    stop.set()
+    poller.join()
+
+    packets = len(sends)
+    gas = [
+        relayer_gas(c, addr, h) for c, addr, h in zip([cli1, cli2], relayers, heights)
+    ]
+    stats = summarize(acks[seq] - sends[seq] for seq in acks) | {
+        "packets": packets,
+        "acked": len(acks),
+        "throughput": len(acks) / (max(acks.values()) - min(sends.values())),
+        "relayer_gas_src": gas[0],
+        "relayer_gas_dst": gas[1],
+        "relayer_gas_per_packet": sum(gas) / packets,
+    }
+    print(ibc_relayer.relayer, stats)
+    regressions = benchmark_results.record(f"ibc/{ibc_relayer.relayer}", stats)
+    assert len(acks) == packets, f"{packets - len(acks)} packets not acked"
+    assert all(gas), "no relayer tx found"
+    assert not regressions, regressions
+
+
+@pytest.fixture(scope="module", params=["mantra", "geth"])
+def evm_node(request):
+    "the same benchmark on mantra and on geth, only the selected one is started"
+    return SimpleNamespace(
+        name=request.param, node=request.getfixturevalue(request.param)
+    )
+
+
+def seed_priority_txs(w3, rounds, count):
+    "rounds of transfers with random priority tips, each round in its own block"
+    rnd = random.Random(0)
+    for _ in range(rounds):
+        base_fee = w3.eth.get_block("latest").baseFeePerGas
+        txs = []
+        for _ in range(count):
+            tip = rnd.choice(MEMPOOL_TIPS)
+            txs.append(
+                {
+                    "to": ADDRS["community"],
+                    "value": 1,
+                    "gas": 21000,
+                    "maxFeePerGas": base_fee * 2 + tip,
+                    "maxPriorityFeePerGas": tip,
+                }
+            )
+        receipts = send_from_senders(w3, txs)
+        assert all(r.status == 1 for r in receipts)
+
+
+def fee_history_rewards(block, receipts, percentiles):
+    """
+    the reward percentiles of a block as computed by geth, the effective tips
+    sorted ascending and weighted by the gas used of each tx.
+    """
+    if not receipts:
+        return [0] * len(percentiles)
+    txs = sorted(
+        (r.effectiveGasPrice - block.baseFeePerGas, r.gasUsed) for r in receipts
+    )
+    rewards = []
+    index = 0
+    total = txs[0][1]
+    for p in percentiles:
+        threshold = int(block.gasUsed * p / 100)
+        while total < threshold and index < len(txs) - 1:
+            index += 1
+            total += txs[index][1]
+        rewards.append(txs[index][0])
+    return rewards
+
+
+def test_fee_history(evm_node, benchmark_results):
+    """
+    poll eth_feeHistory at the window cap with many reward percentiles over
+    blocks of mixed priority txs, at high concurrency as wallets do on every
+    block, report the latency, the node cpu time per request and whether the
+    concurrent responses agree, on mantra and on geth.
+    """
+    node = evm_node.node
+    w3 = node.w3
+    seed_priority_txs(w3, FEE_SEED_BLOCKS, FEE_TXS_PER_BLOCK)
+    height = w3.eth.block_number
+    params = [FEE_HISTORY_CAP, hex(height), FEE_HISTORY_PERCENTILES]
+    responses = []
+
+    def call():
+        rsp = rpc(w3, "eth_feeHistory", params)
+        responses.append(json.dumps(rsp, sort_keys=True))
+
+    pid = node.node_pid()
+    cpu = process_cpu_time(pid)
+    stats = run_concurrently(call, concurrency=FEE_CONCURRENCY)
+    cpu = process_cpu_time(pid) - cpu
+    stats |= {
+        "cpu_per_request": cpu / len(responses),
+        "distinct_responses": len(set(responses)),
+    }
+    print(evm_node.name, stats)
+    regressions = benchmark_results.record(f"fee_history/{evm_node.name}", stats)
+
+    history = rpc(w3, "eth_feeHistory", params)
+    blocks = min(FEE_HISTORY_CAP, height + 1)
+    assert int(history["oldestBlock"], 16) == height - blocks + 1
+    assert len(history["baseFeePerGas"]) == blocks + 1
+    assert len(history["gasUsedRatio"]) == blocks
+    assert len(history["reward"]) == blocks
+    # the seeded blocks, recomputed from the receipts
+    for i in range(max(0, blocks - FEE_SEED_BLOCKS * 2), blocks):
+        block = w3.eth.get_block(height - blocks + 1 + i)
+        expected = fee_history_rewards(
+            block, get_block_receipts(w3, block.number), FEE_HISTORY_PERCENTILES
+        )
+        assert [int(r, 16) for r in history["reward"][i]] == expected, block.number
+    assert len(set(responses)) == 1, "concurrent responses differ"
+    assert not regressions, regressions
+
+
+def fq_bytes(x, size=32):
+    return x.n.to_bytes(size, "big")
+
+
+def modexp_input(size):
+    "operands of `size` bytes each, all bits of the exponent set"
+    base = exp = b"\xff" * size
+    mod = b"\xff" * (size - 1) + b"\xfd"
+    lengths = b"".join(size.to_bytes(32, "big") for _ in range(3))
+    return lengths + base + exp + mod
+
+
+def bn256_pairing_input(count):
+    "(G1, G2) pairs, G2 coordinates with the imaginary part first"
+    (x, y), (x2, y2) = bn128.G1, bn128.G2
+    pair = fq_bytes(x) + fq_bytes(y)
+    for c in [x2, y2]:
+        pair += fq_bytes(c.coeffs[1]) + fq_bytes(c.coeffs[0])
+    return pair * count
+
+
+def bls_g1_bytes(point):
+    # 48 byte field elements left padded to 64 bytes
+    return b"".join(fq_bytes(c, 64) for c in point)
+
+
+def bls_g2_bytes(point):
+    return b"".join(fq_bytes(c, 64) for xy in point for c in xy.coeffs)
+
+
+def bls_multiexp_input(count):
+    "(G1, scalar) pairs with distinct full width scalars"
+    point = bls_g1_bytes(bls12_381.G1)
+    return b"".join(
+        point + (bls12_381.curve_order - i - 1).to_bytes(32, "big")
+        for i in range(count)
+    )
+
+
+def bls_pairing_input(count):
+    return (bls_g1_bytes(bls12_381.G1) + bls_g2_bytes(bls12_381.G2)) * count
+
+
+PRECOMPILE_CASES = (
+    {f"modexp-{n}": (5, modexp_input(n)) for n in MODEXP_SIZES}
+    | {f"bn256_pairing-{n}": (8, bn256_pairing_input(n)) for n in PAIRING_COUNTS}
+    | {f"bls12381_g1msm-{n}": (0x0C, bls_multiexp_input(n)) for n in MULTIEXP_COUNTS}
+    | {f"bls12381_pairing-{n}": (0x0F, bls_pairing_input(n)) for n in PAIRING_COUNTS}
+)
+
+
+def calldata_gas(data):
+    "intrinsic gas of a tx with the calldata, without the eip-7623 floor"
+    return 21000 + sum(16 if b else 4 for b in data)
+
+
+@pytest.mark.parametrize("case", PRECOMPILE_CASES)
+def test_precompile(evm_node, benchmark_results, case):
+    """
+    eth_call a precompile with inputs of increasing size under concurrency,
+    report the latency, the throughput and the wall time per charged gas, on
+    mantra and on geth, mispriced precompiles stand out with a high ns/gas.
+    """
+    w3 = evm_node.node.w3
+    address, data = PRECOMPILE_CASES[case]
+    tx = {
+        "to": Web3.to_checksum_address(address.to_bytes(20, "big")),
+        "data": "0x" + data.hex(),
+        "gas": hex(PRECOMPILE_CALL_GAS),
+    }
+    result = rpc(w3, "eth_call", [tx, "latest"])
+    if case.startswith("modexp"):
+        size = len(data) // 3 - 32
+        base, exp, mod = (
+            int.from_bytes(data[96 + i * size : 96 + (i + 1) * size], "big")
+            for i in range(3)
+        )
+        assert int(result, 16) == pow(base, exp, mod)
+    gas = int(rpc(w3, "eth_estimateGas", [tx]), 16) - calldata_gas(data)
+    stats = run_concurrently(
+        lambda: rpc(w3, "eth_call", [tx, "latest"]), total=PRECOMPILE_REQUESTS
+    )
+    stats |= {
+        "gas": gas,
+        "input_bytes": len(data),
+        "ns_per_gas": stats["p50"] * 1e9 / gas if gas > 0 else None,
+    }
+    print(evm_node.name, case, stats)
+    regressions = benchmark_results.record(f"precompile/{evm_node.name}/{case}", stats)
+    assert not regressions, regressions
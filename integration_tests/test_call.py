@@ -1,18 +1,16 @@
-import json
-
 import pytest
 from hexbytes import HexBytes
 from web3 import Web3
 from web3._utils.contracts import encode_transaction_data
 
-from .utils import CONTRACTS, deploy_contract
+from .utils import ARTIFACTS
 
 
 @pytest.mark.skip(reason="skipping temporary_contract_code test")
 def test_temporary_contract_code(mantra):
     state = 100
     w3: Web3 = mantra.w3
-    info = json.loads(CONTRACTS["Greeter"].read_text())
+    info = ARTIFACTS["Greeter"].info
     data = encode_transaction_data(w3, "intValue", info["abi"], args=[], kwargs={})
     # call an arbitrary address
     address = w3.to_checksum_address("0x0000000000000000000000000000ffffffffffff")
@@ -39,12 +37,13 @@ def test_temporary_contract_code(mantra):
 @pytest.mark.skip(reason="skipping override_state test")
 def test_override_state(mantra):
     w3: Web3 = mantra.w3
-    contract = deploy_contract(w3, CONTRACTS["Greeter"])
+    # only the view functions are called, the shared instance is enough
+    contract = mantra.deployments.get("Greeter")
 
     assert "Hello" == contract.functions.greet().call()
     assert 0 == contract.functions.intValue().call()
 
-    info = json.loads(CONTRACTS["Greeter"].read_text())
+    info = ARTIFACTS["Greeter"].info
     int_value = 100
     hex_state = f"0x{HexBytes(w3.codec.encode(('uint256',), (int_value,))).hex()}"
     state = {
@@ -102,9 +101,6 @@ def test_override_state(mantra):
 
 
 def test_opcode(mantra):
-    contract = deploy_contract(
-        mantra.w3,
-        CONTRACTS["Random"],
-    )
+    contract = mantra.deployments.get("Random")
     res = contract.caller.randomTokenId()
     assert res > 0, res
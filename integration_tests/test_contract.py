@@ -1,5 +1,4 @@
 import asyncio
-import json
 from pathlib import Path
 
 import pytest
@@ -37,29 +36,30 @@ from web3.types import TxParams
 from .utils import (
     ACCOUNTS,
     ADDRS,
+    ARTIFACTS,
     CONTRACTS,
     KEYS,
     WETH9_ARTIFACT,
     WETH_ADDRESS,
     WETH_SALT,
+    DeploymentCache,
     address_to_bytes32,
     assert_weth_flow,
     build_deploy_contract_async,
+    load_artifact,
     w3_wait_for_new_blocks_async,
 )
 
 pytestmark = pytest.mark.asyncio
 
 
-MockERC20_ARTIFACT = json.loads(
-    Path(__file__).parent.joinpath("contracts/contracts/MockERC20.json").read_text()
-)
+MockERC20_ARTIFACT = load_artifact(
+    Path(__file__).parent.joinpath("contracts/contracts/MockERC20.json")
+).info
 
-MULTICALL3ROUTER_ARTIFACT = json.loads(
-    Path(__file__)
-    .parent.joinpath("contracts/contracts/Multicall3Router.json")
-    .read_text()
-)
+MULTICALL3ROUTER_ARTIFACT = load_artifact(
+    Path(__file__).parent.joinpath("contracts/contracts/Multicall3Router.json")
+).info
 MULTICALL3ROUTER = create2_address(
     get_initcode(MULTICALL3ROUTER_ARTIFACT, MULTICALL3_ADDRESS)
 )
@@ -98,7 +98,7 @@ async def test_flow(mantra, connect_mantra):
     await ensure_history_storage_deployed(w3, account)
     assert await w3.eth.get_code(HISTORY_STORAGE_ADDRESS)
     salt = 100
-    initcode = get_initcode(json.loads(CONTRACTS["TestBlockTxProperties"].read_text()))
+    initcode = ARTIFACTS["TestBlockTxProperties"].initcode()
     contract = await ensure_deployed_by_create2(w3, account, initcode, salt=salt)
     assert contract == "0xe1B18c74a33b1E67B5f505C931Ac264668EA94F5"
     height = await w3.eth.block_number
@@ -356,3 +356,24 @@ async def test_deploy_multi(mantra):
     await dec(signer2, dec_amt).transact(w3, owner, to=token)
     allowance = await ERC20.fns.allowance(owner, signer2).call(w3, to=token)
     assert allowance == amt - dec_amt
+
+
+async def test_deployment_cache(mantra):
+    w3 = mantra.async_w3
+    sender = ADDRS["validator"]
+    deployments = DeploymentCache(mantra)
+    contract = await deployments.get_async("TestMessageCall")
+    assert await w3.eth.get_code(contract.address)
+
+    # a new registry reuses the instance deployed on chain
+    nonce = await w3.eth.get_transaction_count(sender)
+    for registry in [deployments, DeploymentCache(mantra)]:
+        again = await registry.get_async("TestMessageCall")
+        assert again.address == contract.address
+    assert await w3.eth.get_transaction_count(sender) == nonce
+
+    # different constructor args are deployed at a different address
+    args = ("MyToken", "MTK", 18)
+    token = await deployments.get_async(CONTRACTS["ERC20MinterBurnerDecimals"], *args)
+    assert token.address != contract.address
+    assert await token.functions.symbol().call() == "MTK"
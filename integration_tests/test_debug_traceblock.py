@@ -1,6 +1,3 @@
-import requests
-from pystarport import ports
-
 from .utils import (
     derive_new_account,
     send_transaction,
@@ -10,7 +7,7 @@ from .utils import (
 )
 
 
-def test_traceblock(mantra):
+def test_traceblock(mantra, trace_cache):
     w3 = mantra.w3
     cli = mantra.cosmos_cli()
     acc = derive_new_account(3)
@@ -41,16 +38,9 @@ def test_traceblock(mantra):
         assert res.status == 1
 
     def trace_blk(blk):
-        url = f"http://127.0.0.1:{ports.evmrpc_port(mantra.base_port(0))}"
-        params = {
-            "method": "debug_traceBlockByNumber",
-            "params": [hex(blk + 1)],
-            "id": 1,
-            "jsonrpc": "2.0",
-        }
-        rsp = requests.post(url, json=params)
-        assert rsp.status_code == 200
-        return rsp.json()["result"]
+        block_hash = w3.eth.get_block(blk + 1).hash
+        method = "debug_traceBlockByNumber"
+        return trace_cache.trace(w3, block_hash, method, [hex(blk + 1)])
 
     total = len(trace_blk(blk))
     expected = 2
@@ -0,0 +1,24 @@
+import pytest
+
+from .diff_utils import (
+    DIFF_SEED,
+    DIFF_STEPS,
+    diff_report,
+    differential_replay,
+    generate_steps,
+)
+
+pytestmark = pytest.mark.slow
+
+
+def test_differential_replay(mantra, geth):
+    """
+    replay the same generated tx sequence on mantra and geth in parallel, the
+    receipts, logs, gas used, call traces and call results should match after
+    normalization.
+    """
+    txs, views = generate_steps(DIFF_SEED, DIFF_STEPS)
+    nodes = {"mantra": mantra.w3, "geth": geth.w3}
+    results, latencies = differential_replay(nodes, txs, views)
+    diffs = diff_report(results, latencies)
+    assert not any(diffs.values()), {k: len(v) for k, v in diffs.items() if v}
@@ -1,14 +1,35 @@
+import asyncio
+import os
+from decimal import Decimal
+from pathlib import Path
+
 import pytest
 from eth_contract.utils import send_transaction
 
+from .network import setup_custom_mantra
 from .utils import (
     ADDRS,
+    CONTRACTS,
+    KEYS,
+    WEI_PER_UOM,
     adjust_base_fee,
+    deploy_contract,
+    next_base_fee,
+    send_raw_transactions,
+    sign_transaction,
+    simulate_base_fees,
     w3_wait_for_block_async,
 )
 
 pytestmark = pytest.mark.asyncio
 
+# blocks filled above the gas target to drive the base fee up
+LOAD_BLOCKS = int(os.getenv("LOAD_BLOCKS", 5))
+LOAD_SENDERS = ["validator", "community", "signer1", "signer2"]
+LOAD_TX_GAS = 10000000
+# blocks to wait for the base fee to decay back to the floor
+DECAY_BLOCKS = 30
+
 
 async def test_dynamic_fee_tx(mantra):
     """
@@ -104,3 +125,90 @@ async def test_current_fee_per_gas_should_not_be_smaller_than_next_block_base_fe
         f"recommended base fee: {recommended_base_fee} is smaller than "
         f"next block {next_block['number']} base fee: {next_block['baseFeePerGas']}"
     )
+
+
+@pytest.fixture(scope="module")
+def mantra_load(tmp_path_factory):
+    "a cluster of its own, so the load does not raise the base fee of other tests"
+    path = tmp_path_factory.mktemp("base-fee-load")
+    yield from setup_custom_mantra(
+        path, 27400, Path(__file__).parent / "configs/default.jsonnet"
+    )
+
+
+def send_load(w3, gas_limit):
+    """
+    send enough storage writing txs to fill `LOAD_BLOCKS` blocks, from several
+    senders, return the heights of the first and last block including them.
+    """
+    contract = deploy_contract(w3, CONTRACTS["BurnGas"])
+    burn = contract.functions.burnGas(LOAD_TX_GAS // 23000)
+    tx = burn.build_transaction({"from": ADDRS["validator"]})
+    # room for the base fee to rise during the load
+    tx["maxFeePerGas"] = w3.eth.get_block("latest").baseFeePerGas * 3
+    tx["maxPriorityFeePerGas"] = 0
+    nonces = {name: w3.eth.get_transaction_count(ADDRS[name]) for name in LOAD_SENDERS}
+    raw_txs = []
+    for i in range(LOAD_BLOCKS * gas_limit // tx["gas"] + 1):
+        name = LOAD_SENDERS[i % len(LOAD_SENDERS)]
+        signed = sign_transaction(w3, tx | {"nonce": nonces[name]}, KEYS[name])
+        nonces[name] += 1
+        raw_txs.append(signed.raw_transaction)
+    receipts = [
+        w3.eth.wait_for_transaction_receipt(txhash, timeout=240)
+        for txhash in send_raw_transactions(w3, raw_txs)
+    ]
+    assert all(r.status == 1 for r in receipts)
+    return min(r.blockNumber for r in receipts), max(r.blockNumber for r in receipts)
+
+
+@pytest.mark.slow
+async def test_base_fee_under_load(mantra_load):
+    """
+    fill blocks above the gas target then let the base fee decay, compare the
+    base fee of the headers and of eth_feeHistory with the simulated series,
+    both step by step from the actual parent and free running from the start.
+    """
+    w3 = mantra_load.async_w3
+    params = mantra_load.cosmos_cli().get_params("feemarket")["params"]
+    floor = int(Decimal(params["min_gas_price"]) * WEI_PER_UOM)
+    gas_limit = (await w3.eth.get_block("latest")).gasLimit
+    loop = asyncio.get_running_loop()
+    start, end = await loop.run_in_executor(None, send_load, mantra_load.w3, gas_limit)
+
+    # until the base fee is back to the floor
+    last = end
+    while last < end + DECAY_BLOCKS:
+        await w3_wait_for_block_async(w3, last + 1)
+        last += 1
+        if (await w3.eth.get_block(last)).baseFeePerGas <= floor:
+            break
+    blocks = [await w3.eth.get_block(h) for h in range(start - 1, last + 1)]
+    fees = [b.baseFeePerGas for b in blocks]
+    gas_limits = [b.gasLimit for b in blocks]
+    gas_used = [b.gasUsed for b in blocks]
+    assert max(fees) > fees[0], "the load didn't raise the base fee"
+    assert fees[-1] == floor, "the base fee didn't decay to the floor"
+
+    # one step from each actual parent, in integer wei
+    for parent, fee in zip(blocks, fees[1:]):
+        expected = next_base_fee(
+            parent.baseFeePerGas, parent.gasLimit, parent.gasUsed, params
+        )
+        assert abs(fee - expected) <= 1, (parent.number + 1, fee, expected)
+
+    # free running, the rounding of each step can add up
+    simulated = simulate_base_fees(fees[0], gas_limits, gas_used, params)
+    for i, (fee, expected) in enumerate(zip(fees[1:], simulated)):
+        assert abs(fee - expected) <= i + 1, (start + i, fee, expected)
+
+    history = (
+        await w3.provider.make_request("eth_feeHistory", [len(blocks), hex(last), []])
+    )["result"]
+    assert int(history["oldestBlock"], 16) == start - 1
+    assert [int(fee, 16) for fee in history["baseFeePerGas"][:-1]] == fees
+    next_fee = int(history["baseFeePerGas"][-1], 16)
+    assert abs(next_fee - simulated[-1]) <= len(blocks)
+    assert history["gasUsedRatio"] == pytest.approx(
+        [used / limit for used, limit in zip(gas_used, gas_limits)]
+    )
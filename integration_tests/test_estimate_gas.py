@@ -38,7 +38,7 @@ def test_out_of_gas_error(mantra):
     gas = 21204
 
     def process(w3):
-        contract = deploy_contract(w3, CONTRACTS["TestMessageCall"])
+        contract = mantra.deployments.get("TestMessageCall")
         tx = contract.functions.test(iterations).build_transaction()
         tx = {"to": contract.address, "data": tx["data"], "gas": hex(gas)}
         call = w3.provider.make_request
@@ -20,9 +20,11 @@ from .utils import (
     assert_register_erc20_denom,
     assert_tf_flow,
     assert_transfer_tokenfactory_denom,
+    batch_call,
     denom_to_erc20_address,
     deploy_contract_async,
     derive_new_account,
+    erc20_balances,
     eth_to_bech32,
     find_duplicate,
     generate_isolated_address,
@@ -85,17 +87,20 @@ async def assert_tokenfactory_flow(cli, w3, signer1, receiver):
         cli, subdenom, _from=addr_signer1, gas=620000
     )
     tf_erc20_addr = denom_to_erc20_address(denom)
-    assert (await ERC20.fns.decimals().call(w3, to=tf_erc20_addr)) == 0
-    total = await ERC20.fns.totalSupply().call(w3, to=tf_erc20_addr)
-    signer1_balance_eth = await ERC20.fns.balanceOf(signer1).call(w3, to=tf_erc20_addr)
+    calls = [
+        (tf_erc20_addr, ERC20.fns.decimals()),
+        (tf_erc20_addr, ERC20.fns.totalSupply()),
+        (tf_erc20_addr, ERC20.fns.balanceOf(signer1)),
+    ]
+    decimals, total, signer1_balance_eth = await batch_call(w3, calls)
+    assert decimals == 0
     balance = cli.balance(addr_signer1, denom)
     assert total == balance == signer1_balance_eth == 0
 
     balance = assert_mint_tokenfactory_denom(
         cli, denom, tf_amt, _from=addr_signer1, gas=gas
     )
-    signer1_balance_eth = await ERC20.fns.balanceOf(signer1).call(w3, to=tf_erc20_addr)
-    total = await ERC20.fns.totalSupply().call(w3, to=tf_erc20_addr)
+    _, total, signer1_balance_eth = await batch_call(w3, calls)
     assert total == balance == signer1_balance_eth == tf_amt
 
     balance = assert_transfer_tokenfactory_denom(
@@ -107,12 +112,12 @@ async def assert_tokenfactory_flow(cli, w3, signer1, receiver):
     balance = assert_burn_tokenfactory_denom(
         cli, denom, burn_amt, _from=addr_signer1, gas=gas
     )
-    signer1_balance_eth = await ERC20.fns.balanceOf(signer1).call(w3, to=tf_erc20_addr)
+    receiver_balance = cli.balance(addr_receiver, denom)
+    signer1_balance_eth, receiver_balance_eth = await erc20_balances(
+        w3, tf_erc20_addr, [signer1, receiver]
+    )
     assert balance == signer1_balance_eth == tf_amt - transfer_amt - burn_amt
-
-    balance = cli.balance(addr_receiver, denom)
-    signer1_balance_eth = await ERC20.fns.balanceOf(receiver).call(w3, to=tf_erc20_addr)
-    assert balance == signer1_balance_eth == transfer_amt
+    assert receiver_balance == receiver_balance_eth == transfer_amt
 
 
 async def test_ibc_transfer(ibc):
@@ -142,10 +147,12 @@ async def test_ibc_transfer(ibc):
     assert_dynamic_fee(cli)
     assert_dup_events(cli)
     ibc_erc20_addr = ibc_denom_address(dst_denom)
-    assert (await ERC20.fns.decimals().call(w3, to=ibc_erc20_addr)) == 0
-    total = await ERC20.fns.totalSupply().call(w3, to=ibc_erc20_addr)
+    calls = [
+        (ibc_erc20_addr, ERC20.fns.decimals()),
+        (ibc_erc20_addr, ERC20.fns.totalSupply()),
+    ]
+    assert await batch_call(w3, calls) == [0, transfer_amt]
     receiver = derive_new_account(4).address
-    assert total == transfer_amt
 
     # check the approve transfer and transferFrom flow of tf tokens
     await assert_tf_flow(w3, receiver, signer1, signer2, ibc_erc20_addr)
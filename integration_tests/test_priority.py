@@ -14,6 +14,7 @@ from .utils import (
     eth_to_bech32,
     send_transaction,
     sign_transaction,
+    wait_for_block_receipts,
     wait_for_new_blocks,
 )
 
@@ -112,15 +113,16 @@ def test_priority(mantra):
     signed = [sign_transaction(w3, tx, key=KEYS[sender]) for sender, tx in test_cases]
     # send the txs from low priority to high,
     # but the later sent txs should be included earlier.
+    start = w3.eth.block_number
     txhashes = [w3.eth.send_raw_transaction(tx.raw_transaction) for tx in signed]
 
-    receipts = [w3.eth.wait_for_transaction_receipt(txhash) for txhash in txhashes]
-    print(receipts)
-    assert all(receipt.status == 1 for receipt in receipts), "expect all txs success"
+    receipts = wait_for_block_receipts(w3, txhashes, start)
+    # expect all txs success
+    receipts.verify({txhash: 1 for txhash in txhashes})
 
     # the later txs should be included earlier because of higher priority
     # FIXME there's some non-deterministics due to mempool logic
-    tx_indexes = [(r.blockNumber, r.transactionIndex) for r in receipts]
+    tx_indexes = receipts.positions(txhashes)
     print(tx_indexes)
     # the first sent tx are included later, because of lower priority
     # ensure desc within continuous block
@@ -6,6 +6,7 @@ from eth_utils import abi, big_endian_to_int
 from hexbytes import HexBytes
 from web3.datastructures import AttributeDict
 
+from .bench_utils import assert_gas_used
 from .network import setup_custom_mantra
 from .utils import (
     ADDRS,
@@ -44,14 +45,13 @@ def test_pruned_node(mantra):
     )
     signed = sign_transaction(w3, tx, KEYS["validator"])
     txhash = w3.eth.send_raw_transaction(signed.raw_transaction)
-    exp_gas_used = 51382
 
     print("wait for prunning happens")
     wait_for_new_blocks(mantra.cosmos_cli(0), 10)
 
     print("wait for transaction receipt", txhash.hex())
     txreceipt = w3.eth.wait_for_transaction_receipt(txhash)
-    assert txreceipt.gasUsed == exp_gas_used
+    assert_gas_used("TestERC20A.transfer", txreceipt.gasUsed)
     assert len(txreceipt.logs) == 1
     data = "0x000000000000000000000000000000000000000000000000000000000000000a"
     expect_log = {
@@ -94,7 +94,7 @@ def test_pruned_node(mantra):
     exp_tx = AttributeDict(
         {
             "from": "0x57f96e6B86CdeFdB3d412547816a82E3E0EbF9D2",
-            "gas": exp_gas_used,
+            "gas": txreceipt.gasUsed,
             "input": HexBytes(
                 "0xa9059cbb000000000000000000000000378c50d9264c63f3f92b806d4ee56e"
                 "9d86ffb3ec000000000000000000000000000000000000000000000000000000"
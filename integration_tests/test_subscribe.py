@@ -1,7 +1,5 @@
 import asyncio
-import json
 import time
-from collections import defaultdict
 
 import websockets
 from eth_utils import abi
@@ -21,60 +19,7 @@ from .utils import (
     wait_for_new_blocks,
     wait_for_port,
 )
-
-
-class Client:
-    def __init__(self, ws):
-        self._ws = ws
-        self._gen_id = 0
-        self._subs = defaultdict(asyncio.Queue)
-        self._rsps = defaultdict(asyncio.Queue)
-
-    def gen_id(self):
-        self._gen_id += 1
-        return self._gen_id
-
-    async def receive_loop(self):
-        while True:
-            msg = json.loads(await self._ws.recv())
-            if "id" in msg:
-                # responses
-                await self._rsps[msg["id"]].put(msg)
-            else:
-                # subscriptions
-                assert msg["method"] == "eth_subscription"
-                sub_id = msg["params"]["subscription"]
-                await self._subs[sub_id].put(msg["params"]["result"])
-
-    async def recv_response(self, rpcid):
-        rsp = await self._rsps[rpcid].get()
-        del self._rsps[rpcid]
-        return rsp
-
-    async def recv_subscription(self, sub_id):
-        return await self._subs[sub_id].get()
-
-    async def subscribe(self, *args):
-        rpcid = self.gen_id()
-        await self._ws.send(
-            json.dumps({"id": rpcid, "method": "eth_subscribe", "params": args})
-        )
-        rsp = await self.recv_response(rpcid)
-        assert "error" not in rsp
-        return rsp["result"]
-
-    def sub_qsize(self, sub_id):
-        return self._subs[sub_id].qsize()
-
-    async def unsubscribe(self, sub_id):
-        rpcid = self.gen_id()
-        await self._ws.send(
-            json.dumps({"id": rpcid, "method": "eth_unsubscribe", "params": [sub_id]})
-        )
-        rsp = await self.recv_response(rpcid)
-        assert "error" not in rsp
-        return rsp["result"]
-
+from .ws_utils import Client
 
 # TestEvent topic from TestMessageCall contract calculated from event signature
 TEST_EVENT_TOPIC = Web3.keccak(text="TestEvent(uint256)")
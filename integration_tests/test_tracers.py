@@ -1,3 +1,4 @@
+import functools
 import itertools
 import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -77,7 +78,7 @@ def test_storage_out_of_gas_error(mantra):
         assert res[0] == res[-1], res
 
 
-def test_trace_transactions_tracers(mantra):
+def test_trace_transactions_tracers(mantra, trace_cache):
     method = "debug_traceTransaction"
     tracer = {"tracer": "callTracer"}
     price = hex(88500000000)
@@ -85,25 +86,24 @@ def test_trace_transactions_tracers(mantra):
 
     def process(w3):
         fund_acc(w3, acc)
-        call = w3.provider.make_request
         tx = {"to": ADDRS["community"], "value": 100, "gasPrice": price}
-        tx_hash = send_transaction(w3, tx)["transactionHash"].hex()
-        tx_hash = f"0x{tx_hash}"
-        tx_res = call(method, [tx_hash])
-        assert tx_res["result"] == EXPECTED_STRUCT_TRACER, ""
-        tx_res = call(method, [tx_hash, tracer])
-        assert tx_res["result"] == EXPECTED_CALLTRACERS, ""
-        tx_res = call(
-            method,
-            [tx_hash, tracer | {"tracerConfig": {"onlyTopCall": True}}],
+        receipt = send_transaction(w3, tx)
+        tx_hash = f"0x{receipt['transactionHash'].hex()}"
+        # traces of a block already traced by the same node version are cached
+        trace = functools.partial(trace_cache.trace, w3, receipt.blockHash, method)
+        assert trace([tx_hash]) == EXPECTED_STRUCT_TRACER
+        assert trace([tx_hash, tracer]) == EXPECTED_CALLTRACERS
+        assert (
+            trace([tx_hash, tracer | {"tracerConfig": {"onlyTopCall": True}}])
+            == EXPECTED_CALLTRACERS
         )
-        assert tx_res["result"] == EXPECTED_CALLTRACERS, ""
-        _, tx = deploy_contract_with_receipt(w3, CONTRACTS["TestERC20A"], key=acc.key)
-        tx_hash = tx["transactionHash"].hex()
-        tx_hash = f"0x{tx_hash}"
+        _, receipt = deploy_contract_with_receipt(
+            w3, CONTRACTS["TestERC20A"], key=acc.key
+        )
+        tx_hash = f"0x{receipt['transactionHash'].hex()}"
         w3_wait_for_new_blocks(w3, 1)
-        tx_res = call(method, [tx_hash, tracer])
-        return json.dumps(tx_res["result"], sort_keys=True)
+        res = trace_cache.trace(w3, receipt.blockHash, method, [tx_hash, tracer])
+        return json.dumps(res, sort_keys=True)
 
     providers = [mantra.w3]
     with ThreadPoolExecutor(len(providers)) as exec:
@@ -3,12 +3,16 @@ import os
 import shutil
 import stat
 import subprocess
-from contextlib import contextmanager
+import threading
+import time
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
 
+import requests
 from pystarport import ports
 from pystarport.cluster import SUPERVISOR_CONFIG_FILE
 
+from .bench_utils import LogWatcher
 from .network import setup_custom_mantra
 from .utils import (
     approve_proposal,
@@ -19,6 +23,127 @@ from .utils import (
     wait_for_port,
 )
 
+# json file collecting the timing report of each upgrade
+UPGRADE_REPORT = os.getenv("UPGRADE_REPORT")
+
+
+class UpgradeTimer:
+    """
+    watch the nodes during an upgrade in a background thread, record the halt
+    height, when each node stopped and cosmovisor switched its binary, when
+    the migration started, the first block after the upgrade and when the
+    json-rpc served it.
+    """
+
+    def __init__(self, c, plan_name, target, interval=0.1):
+        self.c = c
+        self.plan_name = plan_name
+        self.target = target
+        self.interval = interval
+        self.nodes = range(len(c.config["validators"]))
+        self.heights = {}
+        self.swapped = {}
+        self.first_block = None
+        self.json_rpc = None
+        self._stop = threading.Event()
+        self._stack = ExitStack()
+        patterns = {
+            "stopped": f'UPGRADE "{plan_name}" NEEDED',
+            "migration": r"applying upgrade",
+        }
+        self.logs = [
+            LogWatcher(c.base_dir / f"node{i}.log", patterns) for i in self.nodes
+        ]
+
+    def __enter__(self):
+        for log in self.logs:
+            self._stack.enter_context(log)
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._stack.close()
+
+    def _height(self):
+        port = ports.rpc_port(self.c.base_port(0))
+        rsp = requests.get(f"http://127.0.0.1:{port}/status", timeout=1).json()
+        return int(rsp["result"]["sync_info"]["latest_block_height"])
+
+    def _json_rpc_height(self):
+        port = ports.evmrpc_port(self.c.base_port(0))
+        rsp = requests.post(
+            f"http://127.0.0.1:{port}",
+            json={"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber"},
+            timeout=1,
+        ).json()
+        return int(rsp["result"], 0)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            now = time.time()
+            for i in self.nodes:
+                current = self.c.node_home(i) / "cosmovisor/current"
+                if i not in self.swapped and current.resolve().name == self.plan_name:
+                    self.swapped[i] = now
+            try:
+                height = self._height()
+            except (requests.exceptions.RequestException, ValueError):
+                height = None
+            if height is not None:
+                self.heights.setdefault(height, now)
+                if height >= self.target and self.first_block is None:
+                    self.first_block = now
+            if self.first_block is not None and self.json_rpc is None:
+                try:
+                    if self._json_rpc_height() >= self.target:
+                        self.json_rpc = now
+                except (requests.exceptions.RequestException, ValueError, KeyError):
+                    pass
+            if self.json_rpc is not None:
+                return
+
+    def report(self):
+        "the timings in seconds since the halt height was seen"
+        halt_height = max((h for h in self.heights if h < self.target), default=None)
+        halted = self.heights.get(halt_height)
+
+        def since(t):
+            return None if t is None or halted is None else t - halted
+
+        migration = [t for log in self.logs for t in log.events["migration"]]
+        return {
+            "plan": self.plan_name,
+            "target": self.target,
+            "halt_height": halt_height,
+            "nodes": {
+                f"node{i}": {
+                    "stopped": since(next(iter(log.events["stopped"]), None)),
+                    "swapped": since(self.swapped.get(i)),
+                }
+                for i, log in zip(self.nodes, self.logs)
+            },
+            "migration_started": since(min(migration, default=None)),
+            "migration": (
+                self.first_block - min(migration)
+                if migration and self.first_block
+                else None
+            ),
+            "first_block": since(self.first_block),
+            "json_rpc": since(self.json_rpc),
+        }
+
+
+def save_upgrade_report(report, path=UPGRADE_REPORT):
+    "append the report to the json file of all upgrades"
+    if not path:
+        return
+    path = Path(path)
+    reports = json.loads(path.read_text()) if path.exists() else []
+    path.write_text(json.dumps(reports + [report], indent=2))
+
 
 def do_upgrade(c, plan_name, target, gas_prices="0.8uom"):
     print(f"upgrade {plan_name} height: {target}")
@@ -45,8 +170,16 @@ def do_upgrade(c, plan_name, target, gas_prices="0.8uom"):
         Path(c.chain_binary).parent.parent.parent / f"{plan_name}/bin/mantrachaind"
     )
     # block should pass the target height
-    wait_for_block(c.cosmos_cli(), target + 2, timeout=480)
-    wait_for_port(ports.rpc_port(base_port))
+    with UpgradeTimer(c, plan_name, target) as timer:
+        wait_for_block(c.cosmos_cli(), target + 2, timeout=480)
+        wait_for_port(ports.rpc_port(base_port))
+        wait_for_port(ports.evmrpc_port(base_port))
+        deadline = time.time() + 60
+        while timer.json_rpc is None and time.time() < deadline:
+            time.sleep(timer.interval)
+    report = timer.report()
+    print("upgrade timing:", json.dumps(report, indent=2))
+    save_upgrade_report(report)
     return c.cosmos_cli()
 
 
@@ -3,6 +3,7 @@ import base64
 import binascii
 import configparser
 import hashlib
+import hmac
 import json
 import os
 import re
@@ -11,45 +12,107 @@ import socket
 import subprocess
 import sys
 import time
+import weakref
 from collections import defaultdict
+from collections.abc import Mapping
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+from functools import cache
 from itertools import takewhile
 from pathlib import Path
 from urllib.parse import urlparse
 
 import bech32
+import eth_contract
 import eth_utils
 import requests
 import rlp
 from dateutil.parser import isoparse
 from dotenv import load_dotenv
 from eth_account import Account
-from eth_contract.create2 import create2_address
+from eth_account.hdaccount import seed_from_mnemonic
+from eth_account.hdaccount.deterministic import Node, derive_child_key
+from eth_contract.contract import Contract as ABIContract
+from eth_contract.create2 import CREATE2_FACTORY, create2_address, create2_tx
 from eth_contract.deploy_utils import (
     ensure_create2_deployed,
     ensure_deployed_by_create2,
+    ensure_multicall3_deployed,
 )
 from eth_contract.erc20 import ERC20
-from eth_contract.utils import ZERO_ADDRESS, balance_of, get_initcode
+from eth_contract.multicall3 import (
+    MULTICALL3,
+    MULTICALL3_ADDRESS,
+    Call3Value,
+    multicall,
+)
+from eth_contract.utils import balance_of, get_initcode
 from eth_contract.utils import send_transaction as send_transaction_async
+from eth_contract.utils import send_transactions as send_transactions_async
 from eth_contract.weth import WETH
+from eth_keys import keys
+from eth_keys.constants import SECPK1_N
 from eth_utils import to_checksum_address
 from hexbytes import HexBytes
 from web3 import AsyncWeb3
 from web3._utils.transactions import fill_nonce, fill_transaction_defaults
+from web3.exceptions import MethodUnavailable
+
+from .bench_utils import assert_gas_used, current_tx_tracer
+from .cosmos_tx import build_evm_batch_tx
 
 load_dotenv(Path(__file__).parent.parent / "scripts/.env")
 Account.enable_unaudited_hdwallet_features()
-ACCOUNTS = {
-    "validator": Account.from_mnemonic(os.getenv("VALIDATOR1_MNEMONIC")),
-    "validator2": Account.from_mnemonic(os.getenv("VALIDATOR2_MNEMONIC")),
-    "validator3": Account.from_mnemonic(os.getenv("VALIDATOR3_MNEMONIC")),
-    "community": Account.from_mnemonic(os.getenv("COMMUNITY_MNEMONIC")),
-    "signer1": Account.from_mnemonic(os.getenv("SIGNER1_MNEMONIC")),
-    "signer2": Account.from_mnemonic(os.getenv("SIGNER2_MNEMONIC")),
+
+
+class LazyMapping(Mapping):
+    """
+    read-only mapping with a fixed set of keys, values are computed by
+    `factory(key)` on first access and memoized.
+    """
+
+    def __init__(self, keys, factory):
+        self._keys = tuple(keys)
+        self._factory = factory
+        self._values = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            if key not in self._keys:
+                raise
+        value = self._values[key] = self._factory(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self._keys)!r})"
+
+
+# account name -> env var of its mnemonic, derived on first use
+ACCOUNT_MNEMONICS = {
+    "validator": "VALIDATOR1_MNEMONIC",
+    "validator2": "VALIDATOR2_MNEMONIC",
+    "validator3": "VALIDATOR3_MNEMONIC",
+    "community": "COMMUNITY_MNEMONIC",
+    "signer1": "SIGNER1_MNEMONIC",
+    "signer2": "SIGNER2_MNEMONIC",
 }
-KEYS = {name: account.key for name, account in ACCOUNTS.items()}
-ADDRS = {name: account.address for name, account in ACCOUNTS.items()}
+ACCOUNTS = LazyMapping(
+    ACCOUNT_MNEMONICS,
+    lambda name: Account.from_mnemonic(os.getenv(ACCOUNT_MNEMONICS[name])),
+)
+KEYS = LazyMapping(ACCOUNT_MNEMONICS, lambda name: ACCOUNTS[name].key)
+ADDRS = LazyMapping(ACCOUNT_MNEMONICS, lambda name: ACCOUNTS[name].address)
 
 DEFAULT_DENOM = "uom"
 CHAIN_ID = "mantra-canary-net-1"
@@ -79,10 +142,31 @@ TEST_CONTRACTS = {
 }
 
 WETH_SALT = 999
-WETH9_ARTIFACT = json.loads(
-    Path(__file__).parent.joinpath("contracts/contracts/WETH9.json").read_text()
-)
-WETH_ADDRESS = create2_address(get_initcode(WETH9_ARTIFACT), WETH_SALT)
+
+
+@cache
+def weth9_artifact():
+    return load_artifact(
+        Path(__file__).parent.joinpath("contracts/contracts/WETH9.json")
+    ).info
+
+
+@cache
+def weth_address():
+    return create2_address(get_initcode(weth9_artifact()), WETH_SALT)
+
+
+# computed on first access to keep `import utils` cheap
+LAZY_ATTRS = {
+    "WETH9_ARTIFACT": weth9_artifact,
+    "WETH_ADDRESS": weth_address,
+}
+
+
+def __getattr__(name):
+    if name in LAZY_ATTRS:
+        return LAZY_ATTRS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def contract_path(name, filename):
@@ -101,17 +185,88 @@ CONTRACTS = {
 }
 
 
+class Artifact:
+    """
+    contract artifact parsed once, keeps the abi, bytecode and initcode,
+    and memoizes the function and event encoders.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.info = json.loads(self.path.read_text())
+        self.abi = self.info["abi"]
+        self.bytecode = self.info.get("byte", self.info.get("bytecode", ""))
+        self.contract = ABIContract(self.abi)
+        self._initcodes = {}
+        self._topics = {}
+        self._factories = weakref.WeakKeyDictionary()
+
+    @property
+    def fns(self):
+        return self.contract.fns
+
+    def initcode(self, *args):
+        "deploy initcode with encoded constructor arguments"
+        try:
+            return self._initcodes[args]
+        except KeyError:
+            code = self._initcodes[args] = get_initcode(self.info, *args)
+            return code
+        except TypeError:  # unhashable arguments
+            return get_initcode(self.info, *args)
+
+    def selector(self, name):
+        return getattr(self.fns, name).selector
+
+    def encode(self, name, *args):
+        "calldata of calling function `name` with `args`"
+        return getattr(self.fns, name)(*args).data
+
+    def decode(self, name, data):
+        "decode the return data of function `name`"
+        return getattr(self.fns, name).decode(data)
+
+    def topic(self, name):
+        try:
+            return self._topics[name]
+        except KeyError:
+            topic = self._topics[name] = getattr(self.contract.events, name).topic
+            return topic
+
+    def factory(self, w3):
+        "web3 contract factory bound to `w3`, built once per provider"
+        try:
+            return self._factories[w3]
+        except KeyError:
+            factory = self._factories[w3] = w3.eth.contract(
+                abi=self.abi, bytecode=self.bytecode
+            )
+            return factory
+
+    def at(self, w3, address):
+        "web3 contract instance at `address`"
+        return self.factory(w3)(address=address)
+
+
+@cache
+def load_artifact(path):
+    "load and parse the artifact at `path` only once"
+    return Artifact(path)
+
+
+ARTIFACTS = LazyMapping(CONTRACTS, lambda name: load_artifact(CONTRACTS[name]))
+
+
 class Contract:
-    def __init__(self, contract_path, private_key=KEYS["validator"], chain_id=5887):
+    def __init__(self, contract_path, private_key=None, chain_id=5887):
+        private_key = private_key or KEYS["validator"]
         self.chain_id = chain_id
         self.account = Account.from_key(private_key)
         self.address = self.account.address
         self.private_key = private_key
-        with open(contract_path) as f:
-            json_data = f.read()
-            contract_json = json.loads(json_data)
-        self.bytecode = contract_json["bytecode"]
-        self.abi = contract_json["abi"]
+        self.artifact = load_artifact(contract_path)
+        self.bytecode = self.artifact.bytecode
+        self.abi = self.artifact.abi
         self.contract = None
         self.w3 = None
 
@@ -119,32 +274,41 @@ class Contract:
         "Deploy contract on `w3` and return the receipt."
         if self.contract is None:
             self.w3 = w3
-            contract = self.w3.eth.contract(abi=self.abi, bytecode=self.bytecode)
+            contract = self.artifact.factory(w3)
             transaction = contract.constructor().build_transaction(
                 {"chainId": self.chain_id, "from": self.address}
             )
             receipt = send_transaction(self.w3, transaction, self.private_key)
-            self.contract = self.w3.eth.contract(
-                address=receipt.contractAddress, abi=self.abi
-            )
+            self.contract = self.artifact.at(w3, receipt.contractAddress)
             return receipt
         else:
             return receipt
 
+    def build_transaction(self, name, *args, **tx):
+        "transaction calling function `name`, encoded with the cached abi"
+        return {
+            "chainId": self.chain_id,
+            "from": self.address,
+            "to": self.contract.address,
+            "data": self.artifact.encode(name, *args),
+            **tx,
+        }
+
+    def call(self, name, *args):
+        data = self.w3.eth.call(
+            {"to": self.contract.address, "data": self.artifact.encode(name, *args)}
+        )
+        return self.artifact.decode(name, data)
+
 
 class Greeter(Contract):
     "Greeter contract."
 
     def transfer(self, string):
         "Call contract on `w3` and return the receipt."
-        transaction = self.contract.functions.setGreeting(string).build_transaction(
-            {
-                "chainId": self.chain_id,
-                "from": self.address,
-            }
-        )
+        transaction = self.build_transaction("setGreeting", string)
         receipt = send_transaction(self.w3, transaction, self.private_key)
-        assert string == self.contract.functions.greet().call()
+        assert string == self.call("greet")
         return receipt
 
 
@@ -153,13 +317,8 @@ class RevertTestContract(Contract):
 
     def transfer(self, value):
         "Call contract on `w3` and return the receipt."
-        transaction = self.contract.functions.transfer(value).build_transaction(
-            {
-                "chainId": self.chain_id,
-                "from": self.address,
-                "gas": 100000,  # skip estimateGas error
-            }
-        )
+        # skip estimateGas error
+        transaction = self.build_transaction("transfer", value, gas=100000)
         receipt = send_transaction(self.w3, transaction, self.private_key)
         return receipt
 
@@ -340,29 +499,40 @@ def find_duplicate(attributes):
     return None
 
 
-def sign_transaction(w3, tx, key=KEYS["validator"]):
+def sign_transaction(w3, tx, key=None):
     "fill default fields and sign"
-    acct = Account.from_key(key)
+    acct = Account.from_key(key or KEYS["validator"])
     tx["from"] = acct.address
     tx = fill_transaction_defaults(w3, tx)
     tx = fill_nonce(w3, tx)
     return acct.sign_transaction(tx)
 
 
+def send_raw_transaction(w3, raw):
+    "send the raw tx, recorded by the active tx tracer if any"
+    tracer = current_tx_tracer()
+    if tracer is None:
+        return w3.eth.send_raw_transaction(raw), None
+    submit = time.monotonic()
+    txhash = w3.eth.send_raw_transaction(raw)
+    return txhash, tracer.eth_submitted(w3, txhash, submit)
+
+
 def send_raw_transactions(w3, raw_transactions):
     with ThreadPoolExecutor(len(raw_transactions)) as exec:
-        tasks = [
-            exec.submit(w3.eth.send_raw_transaction, raw) for raw in raw_transactions
-        ]
-        sended_hash_set = {future.result() for future in as_completed(tasks)}
+        tasks = [exec.submit(send_raw_transaction, w3, raw) for raw in raw_transactions]
+        sended_hash_set = {future.result()[0] for future in as_completed(tasks)}
     return sended_hash_set
 
 
-def send_transaction(w3, tx, key=KEYS["validator"], check=True):
+def send_transaction(w3, tx, key=None, check=True):
     signed = sign_transaction(w3, tx, key)
-    txhash = w3.eth.send_raw_transaction(signed.raw_transaction)
+    txhash, record = send_raw_transaction(w3, signed.raw_transaction)
     if check:
-        return w3.eth.wait_for_transaction_receipt(txhash)
+        receipt = w3.eth.wait_for_transaction_receipt(txhash)
+        if record is not None:
+            current_tx_tracer().eth_receipt(record, receipt, w3)
+        return receipt
     return txhash
 
 
@@ -384,83 +554,262 @@ def send_txs(w3, cli, to, keys, params):
     return block_num_0, sended_hash_set
 
 
-def deploy_contract(w3, jsonfile, args=(), key=KEYS["validator"], exp_gas_used=None):
+# providers known not to support eth_getBlockReceipts
+NO_BLOCK_RECEIPTS = weakref.WeakSet()
+
+
+def get_block_receipts(w3, height):
+    """
+    all receipts of a block with eth_getBlockReceipts, fallback to a single
+    batch of eth_getTransactionReceipt requests.
+    """
+    if w3 not in NO_BLOCK_RECEIPTS:
+        try:
+            return w3.eth.get_block_receipts(height)
+        except MethodUnavailable:
+            NO_BLOCK_RECEIPTS.add(w3)
+    txhashes = w3.eth.get_block(height).transactions
+    if not txhashes:
+        return []
+    with w3.batch_requests() as batch:
+        for txhash in txhashes:
+            batch.add(w3.eth.get_transaction_receipt(txhash))
+        return batch.execute()
+
+
+class BlockReceipts:
+    """
+    txs and receipts of a block range, fetched with two calls per block and
+    indexed by tx hash and by sender and nonce.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.by_hash = {}
+        self.by_sender = defaultdict(dict)
+
+    def fetch(self, w3, start, end=None):
+        "fetch the blocks from `start` to `end` inclusive"
+        for height in range(start, (start if end is None else end) + 1):
+            self.add(
+                w3.eth.get_block(height, full_transactions=True),
+                get_block_receipts(w3, height),
+            )
+        return self
+
+    def add(self, block, receipts):
+        assert len(block.transactions) == len(receipts), block.number
+        self.blocks.append((block, receipts))
+        for tx, receipt in zip(block.transactions, receipts):
+            self.by_hash[HexBytes(tx.hash)] = receipt
+            self.by_sender[tx["from"]][tx.nonce] = receipt
+
+    def __getitem__(self, txhash):
+        return self.by_hash[HexBytes(txhash)]
+
+    def __contains__(self, txhash):
+        return HexBytes(txhash) in self.by_hash
+
+    def __len__(self):
+        return len(self.by_hash)
+
+    def positions(self, txhashes):
+        "(block number, tx index) of each tx"
+        return [
+            (receipt.blockNumber, receipt.transactionIndex)
+            for receipt in map(self.__getitem__, txhashes)
+        ]
+
+    def verify(self, statuses=None, non_evm=False):
+        """
+        check in one pass that receipts follow the block txs order, the gas
+        used adds up to the block gas used, the txs of each sender are included
+        in nonce order, and the status of the txs in `statuses` (tx hash ->
+        status) is expected. set `non_evm` if the blocks may also hold non-evm
+        txs.
+        """
+        for block, receipts in self.blocks:
+            cumulative = 0
+            for i, (tx, receipt) in enumerate(zip(block.transactions, receipts)):
+                assert receipt.transactionHash == tx.hash, (block.number, i)
+                assert receipt.transactionIndex == tx.transactionIndex == i
+                assert receipt.blockNumber == block.number
+                assert receipt.blockHash == block.hash
+                assert receipt["from"] == tx["from"]
+                assert 0 < receipt.gasUsed <= tx.gas, receipt
+                if non_evm:
+                    # the cumulative gas also counts the non-evm txs before
+                    # the tx, which are not in the block txs
+                    assert receipt.cumulativeGasUsed >= cumulative + receipt.gasUsed
+                else:
+                    assert receipt.cumulativeGasUsed == cumulative + receipt.gasUsed
+                cumulative = receipt.cumulativeGasUsed
+            # the block gas used counts the non-evm txs after the last evm one too
+            if non_evm:
+                assert cumulative <= block.gasUsed, block.number
+            else:
+                assert cumulative == block.gasUsed, block.number
+        for sender, receipts in self.by_sender.items():
+            nonces = sorted(receipts)
+            positions = [
+                (receipts[n].blockNumber, receipts[n].transactionIndex) for n in nonces
+            ]
+            assert positions == sorted(positions), sender
+        for txhash, status in (statuses or {}).items():
+            assert self[txhash].status == status, self[txhash]
+
+
+def wait_for_block_receipts(w3, txhashes, start, timeout=120, sleep=0.3):
+    """
+    wait until all the `txhashes` are included in blocks after `start`,
+    scanning the receipts of each new block instead of polling every tx.
+    """
+    result = BlockReceipts()
+    height = start
+    deadline = time.time() + timeout
+    while not all(txhash in result for txhash in txhashes):
+        if time.time() > deadline:
+            raise TimeoutError(f"wait for {len(txhashes)} txs timeout")
+        latest = w3.eth.block_number
+        if latest >= height:
+            result.fetch(w3, height, latest)
+            height = latest + 1
+        else:
+            time.sleep(sleep)
+    return result
+
+
+def deploy_contract(w3, jsonfile, args=(), key=None, gas_snapshot=None):
     """
     deploy contract and return the deployed contract instance
     """
-    contract, _ = deploy_contract_with_receipt(w3, jsonfile, args, key, exp_gas_used)
+    contract, _ = deploy_contract_with_receipt(w3, jsonfile, args, key, gas_snapshot)
     return contract
 
 
-def deploy_contract_with_receipt(
-    w3, jsonfile, args=(), key=KEYS["validator"], exp_gas_used=None
-):
+def deploy_contract_with_receipt(w3, jsonfile, args=(), key=None, gas_snapshot=None):
     """
-    deploy contract and return the deployed contract instance and receipt
+    deploy contract and return the deployed contract instance and receipt,
+    the gas used is checked against the snapshot named `gas_snapshot` if any
     """
+    key = key or KEYS["validator"]
     acct = Account.from_key(key)
-    info = json.loads(jsonfile.read_text())
-    bytecode = ""
-    if "bytecode" in info:
-        bytecode = info["bytecode"]
-    if "byte" in info:
-        bytecode = info["byte"]
-    contract = w3.eth.contract(abi=info["abi"], bytecode=bytecode)
+    artifact = load_artifact(jsonfile)
+    contract = artifact.factory(w3)
     tx = contract.constructor(*args).build_transaction({"from": acct.address})
     txreceipt = send_transaction(w3, tx, key)
     assert txreceipt.status == 1
-    if exp_gas_used is not None:
-        assert (
-            exp_gas_used == txreceipt.gasUsed
-        ), f"exp {exp_gas_used}, got {txreceipt.gasUsed}"
+    if gas_snapshot is not None:
+        assert_gas_used(gas_snapshot, txreceipt.gasUsed)
     address = txreceipt.contractAddress
-    return w3.eth.contract(address=address, abi=info["abi"]), txreceipt
+    return artifact.at(w3, address), txreceipt
 
 
-async def build_deploy_contract_async(
-    w3: AsyncWeb3, jsonfile, args=(), key=KEYS["validator"]
-):
-    acct = Account.from_key(key)
-    info = json.loads(jsonfile.read_text())
-    bytecode = ""
-    if "bytecode" in info:
-        bytecode = info["bytecode"]
-    if "byte" in info:
-        bytecode = info["byte"]
-    contract = w3.eth.contract(abi=info["abi"], bytecode=bytecode)
+async def build_deploy_contract_async(w3: AsyncWeb3, jsonfile, args=(), key=None):
+    acct = Account.from_key(key or KEYS["validator"])
+    artifact = load_artifact(jsonfile)
+    contract = artifact.factory(w3)
     tx = await contract.constructor(*args).build_transaction({"from": acct.address})
-    return tx, info["abi"]
+    return tx, artifact.abi
 
 
 async def deploy_contract_async(
-    w3: AsyncWeb3, jsonfile, args=(), key=KEYS["validator"], exp_gas_used=None
+    w3: AsyncWeb3, jsonfile, args=(), key=None, gas_snapshot=None
 ):
-    tx, abi = await build_deploy_contract_async(w3, jsonfile, args, key)
+    key = key or KEYS["validator"]
+    tx, _ = await build_deploy_contract_async(w3, jsonfile, args, key)
     txreceipt = await send_transaction_async(w3, Account.from_key(key), **tx)
-    if exp_gas_used is not None:
-        assert (
-            exp_gas_used == txreceipt.gasUsed
-        ), f"exp {exp_gas_used}, got {txreceipt.gasUsed}"
+    if gas_snapshot is not None:
+        assert_gas_used(gas_snapshot, txreceipt.gasUsed)
     address = txreceipt.contractAddress
-    return w3.eth.contract(address=address, abi=abi)
+    return load_artifact(jsonfile).at(w3, address)
 
 
 def get_contract(w3, address, jsonfile):
-    info = json.loads(jsonfile.read_text())
-    return w3.eth.contract(address=address, abi=info["abi"])
+    return load_artifact(jsonfile).at(w3, address)
 
 
-def create_contract_transaction(w3, jsonfile, args=(), key=KEYS["validator"]):
+def create_contract_transaction(w3, jsonfile, args=(), key=None):
     """
     create contract transaction
     """
-    acct = Account.from_key(key)
-    info = json.loads(jsonfile.read_text())
-    contract = w3.eth.contract(abi=info["abi"], bytecode=info["bytecode"])
+    acct = Account.from_key(key or KEYS["validator"])
+    contract = load_artifact(jsonfile).factory(w3)
     tx = contract.constructor(*args).build_transaction({"from": acct.address})
     return tx
 
 
+def ensure_create2_factory(w3, key=None):
+    "sync version of `ensure_create2_deployed`"
+    if w3.eth.get_code(CREATE2_FACTORY):
+        return
+    raw = HexBytes(
+        Path(eth_contract.__file__)
+        .parent.joinpath("txs/create2.tx")
+        .read_text()
+        .strip()
+    )
+    deployer = Account.recover_transaction(raw)
+    fee = 10**16
+    if w3.eth.get_balance(deployer) < fee:
+        send_transaction(w3, {"to": deployer, "value": fee}, key)
+    receipt = w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(raw))
+    assert receipt.status == 1, "create2 factory deployment failed"
+
+
+def create2_deployment(artifact, *args):
+    "predicted address, initcode and salt derived from the artifact and args"
+    initcode = artifact.initcode(*args)
+    salt = eth_utils.keccak(initcode)
+    return create2_address(initcode, salt), initcode, salt
+
+
+class DeploymentCache:
+    """
+    contracts shared by the tests running on a cluster, each artifact and
+    constructor args combination is deployed once through the CREATE2 factory
+    and the existing instance is returned afterwards.
+
+    only for stateless contracts, whose calls write no storage and whose
+    results and gas don't depend on the deployer or on the calls made by other
+    tests, use `deploy_contract` for anything else and for gas checks.
+    """
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self._deployed = set()
+
+    @staticmethod
+    def artifact(name):
+        return ARTIFACTS[name] if name in CONTRACTS else load_artifact(name)
+
+    def get(self, name, *args, key=None):
+        "web3 contract of the shared instance, deployed on first use"
+        artifact = self.artifact(name)
+        w3 = self.cluster.w3
+        address, initcode, salt = create2_deployment(artifact, *args)
+        if address not in self._deployed:
+            if not w3.eth.get_code(address):
+                ensure_create2_factory(w3, key)
+                receipt = send_transaction(w3, create2_tx(initcode, salt), key)
+                assert receipt.status == 1 and w3.eth.get_code(address), receipt
+            self._deployed.add(address)
+        return artifact.at(w3, address)
+
+    async def get_async(self, name, *args, account=None):
+        "async web3 contract of the shared instance, deployed on first use"
+        artifact = self.artifact(name)
+        w3 = self.cluster.async_w3
+        address, initcode, salt = create2_deployment(artifact, *args)
+        if address not in self._deployed:
+            account = account or ACCOUNTS["validator"]
+            await ensure_create2_deployed(w3, account)
+            await ensure_deployed_by_create2(w3, account, initcode, salt=salt)
+            assert await w3.eth.get_code(address)
+            self._deployed.add(address)
+        return artifact.at(w3, address)
+
+
 def eth_to_bech32(addr, prefix=ADDRESS_PREFIX):
     bz = bech32.convertbits(HexBytes(addr), 8, 5)
     return bech32.bech32_encode(prefix, bz)
@@ -725,42 +1074,15 @@ def contract_address(addr, nonce):
     )
 
 
-def build_batch_tx(w3, cli, txs, key=KEYS["validator"]):
-    "return cosmos batch tx and eth tx hashes"
+def build_batch_tx(w3, txs, key=None):
+    "return the encoded cosmos batch tx and eth tx hashes"
+    key = key or KEYS["validator"]
     signed_txs = [sign_transaction(w3, tx, key) for tx in txs]
-    tmp_txs = [
-        cli.build_evm_tx(f"0x{s.raw_transaction.hex()}", chain_id=EVM_CHAIN_ID)
-        for s in signed_txs
-    ]
-
-    msgs = [tx["body"]["messages"][0] for tx in tmp_txs]
-    fee = sum(int(tx["auth_info"]["fee"]["amount"][0]["amount"]) for tx in tmp_txs)
-    gas_limit = sum(int(tx["auth_info"]["fee"]["gas_limit"]) for tx in tmp_txs)
-
-    tx_hashes = [signed.hash for signed in signed_txs]
-
-    # build batch cosmos tx
-    return {
-        "body": {
-            "messages": msgs,
-            "memo": "",
-            "timeout_height": "0",
-            "extension_options": [
-                {"@type": "/cosmos.evm.vm.v1.ExtensionOptionsEthereumTx"}
-            ],
-            "non_critical_extension_options": [],
-        },
-        "auth_info": {
-            "signer_infos": [],
-            "fee": {
-                "amount": [{"denom": "aom", "amount": str(fee)}],
-                "gas_limit": str(gas_limit),
-                "payer": "",
-                "granter": "",
-            },
-        },
-        "signatures": [],
-    }, tx_hashes
+    sender = Account.from_key(key).address
+    tx = build_evm_batch_tx(
+        [signed.raw_transaction for signed in signed_txs], [sender] * len(txs)
+    )
+    return tx, [signed.hash for signed in signed_txs]
 
 
 def approve_proposal(n, events, event_query_tx=False):
@@ -805,15 +1127,218 @@ def submit_gov_proposal(mantra, tmp_path, messages, **kwargs):
     return rsp
 
 
+# BIP44 parent node of the ethereum accounts, children are `{HD_BASE_PATH}/{n}`
+HD_BASE_PATH = "m/44'/60'/0'/0"
+# max calls packed into a single multicall3 aggregate3 eth_call
+MULTICALL_BATCH_SIZE = 500
+# providers already checked to have multicall3 deployed
+MULTICALL3_READY = weakref.WeakSet()
+# max recipients funded by a single multicall3 aggregate3Value tx
+FUND_BATCH_SIZE = 500
+
+
+class PoolAccount:
+    """
+    a private key of the pool with its address, the address is computed on
+    first access and the `LocalAccount` is only built when it's used to sign.
+    """
+
+    def __init__(self, key, address=None):
+        self.key = HexBytes(key)
+        self._address = address
+        self._account = None
+
+    @property
+    def address(self):
+        # eth_keys uses the coincurve backend when it's installed, which is
+        # two orders of magnitude faster than the native one
+        if self._address is None:
+            public_key = keys.PrivateKey(self.key).public_key
+            self._address = public_key.to_checksum_address()
+        return self._address
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._account is None:
+            self._account = Account.from_key(self.key)
+        return getattr(self._account, name)
+
+
+class AccountPool:
+    """
+    accounts derived from the children of the `base_path` node of a mnemonic.
+
+    the expensive parts (pbkdf2 of the mnemonic, the hardened path to the
+    parent node and its public key) are computed once, so deriving a child
+    only costs a hmac, the public key of the child is only computed for its
+    address.
+    """
+
+    def __init__(self, mnemonic, base_path=HD_BASE_PATH):
+        self.mnemonic = mnemonic
+        self.base_path = base_path
+        self._parent = None
+        self._accounts = {}
+
+    def __getitem__(self, n):
+        acct = self._accounts.get(n)
+        if acct is None:
+            acct = self._accounts[n] = PoolAccount(self.derive_key(n))
+        return acct
+
+    def __len__(self):
+        return len(self._accounts)
+
+    @property
+    def fingerprint(self):
+        "identify the mnemonic and path of the persisted keys"
+        return hashlib.sha256(f"{self.mnemonic}|{self.base_path}".encode()).hexdigest()
+
+    def parent_node(self):
+        "return the private key, chain code and public key of the parent node"
+        if self._parent is None:
+            seed = seed_from_mnemonic(self.mnemonic, "")
+            main = hmac.digest(b"Bitcoin seed", seed, "sha512")
+            key, chain_code = main[:32], main[32:]
+            for node in self.base_path.split("/")[1:]:
+                key, chain_code = derive_child_key(key, chain_code, Node.decode(node))
+            point = keys.PrivateKey(key).public_key.to_compressed_bytes()
+            self._parent = (key, chain_code, point)
+        return self._parent
+
+    def derive_key(self, n):
+        "BIP32 CKDpriv of the soft child `n` with the cached parent public key"
+        key, chain_code, point = self.parent_node()
+        child = hmac.digest(chain_code, point + n.to_bytes(4, "big"), "sha512")
+        tweak = int.from_bytes(child[:32], "big")
+        child_key = (tweak + int.from_bytes(key, "big")) % SECPK1_N
+        if tweak >= SECPK1_N or child_key == 0:
+            # BIP32 has no key at this index (< 2**-127 probability), wallets
+            # proceed with the next index
+            raise ValueError(f"invalid BIP32 child {n}")
+        return child_key.to_bytes(32, "big")
+
+    def accounts(self, count, start=0):
+        "the `count` valid children from `start`, skipping the invalid ones"
+        accounts, n = [], start
+        while len(accounts) < count:
+            try:
+                accounts.append(self[n])
+            except ValueError:
+                pass
+            n += 1
+        return accounts
+
+    def save(self, path):
+        "persist the keys and addresses, so other sessions can load instead of derive"
+        path = Path(path)
+        accounts = sorted(self._accounts.items())
+        data = {
+            "fingerprint": self.fingerprint,
+            "keys": {str(n): acct.key.hex() for n, acct in accounts},
+            "addresses": {str(n): acct.address for n, acct in accounts},
+        }
+        path.write_text(json.dumps(data))
+
+    def load(self, path):
+        "load keys persisted by `save`, ignore the file if it's from other mnemonic"
+        path = Path(path)
+        if not path.exists():
+            return 0
+        data = json.loads(path.read_text())
+        if data.get("fingerprint") != self.fingerprint:
+            return 0
+        addresses = data.get("addresses", {})
+        for n, key in data["keys"].items():
+            if int(n) not in self._accounts:
+                self._accounts[int(n)] = PoolAccount(key, addresses.get(n))
+        return len(data["keys"])
+
+    async def fund(self, w3, funder, count, amount, start=0, **kwargs):
+        "derive `count` accounts from `start`, and fund each of them `amount` wei"
+        accounts = self.accounts(count, start)
+        await fund_accounts(w3, funder, [a.address for a in accounts], amount, **kwargs)
+        return accounts
+
+
+async def fund_accounts(w3, funder, addresses, amount, batch_size=FUND_BATCH_SIZE):
+    """
+    transfer `amount` wei to each of the `addresses` with multicall3
+    aggregate3Value, `batch_size` recipients per tx, and all txs are
+    sent before waiting for the receipts, so they share blocks.
+    """
+    await ensure_multicall3_deployed(w3, funder)
+    txs = []
+    for i in range(0, len(addresses), batch_size):
+        batch = addresses[i : i + batch_size]
+        calls = [Call3Value(addr, False, amount) for addr in batch]
+        txs.append(
+            {
+                "to": MULTICALL3_ADDRESS,
+                "value": amount * len(batch),
+                "data": MULTICALL3.fns.aggregate3Value(calls).data,
+            }
+        )
+    return await send_transactions_async(w3, txs, funder)
+
+
+async def batch_call(
+    w3,
+    calls,
+    block_identifier="latest",
+    allow_failure=False,
+    funder=None,
+    batch_size=MULTICALL_BATCH_SIZE,
+):
+    """
+    run the `(target, fn)` read calls with multicall3 aggregate3, one eth_call
+    per `batch_size` calls, and return the decoded results in order,
+    multiple batches are pinned to the same block so they form a consistent
+    snapshot, failed calls decode to None when `allow_failure` is set.
+    """
+    if w3 not in MULTICALL3_READY:
+        await ensure_multicall3_deployed(w3, funder or ACCOUNTS["validator"])
+        MULTICALL3_READY.add(w3)
+    if len(calls) > batch_size and block_identifier == "latest":
+        block_identifier = await w3.eth.block_number
+    results = []
+    for i in range(0, len(calls), batch_size):
+        results += await multicall(
+            w3,
+            calls[i : i + batch_size],
+            allow_failure,
+            block_identifier=block_identifier,
+        )
+    return results
+
+
+async def erc20_balances(w3, token, owners, **kwargs):
+    "balances of the `owners` in the ERC20 `token`, read in one eth_call"
+    calls = [(token, ERC20.fns.balanceOf(owner)) for owner in owners]
+    return await batch_call(w3, calls, **kwargs)
+
+
+async def eth_balances(w3, addresses, **kwargs):
+    "native balances of the `addresses`, read in one eth_call"
+    calls = [(MULTICALL3_ADDRESS, MULTICALL3.fns.getEthBalance(a)) for a in addresses]
+    return await batch_call(w3, calls, **kwargs)
+
+
+@cache
+def default_account_pool():
+    return AccountPool(os.getenv("SIGNER1_MNEMONIC"))
+
+
 def derive_new_account(n=1):
     # derive a new address
-    account_path = f"m/44'/60'/0'/0/{n}"
-    mnemonic = os.getenv("SIGNER1_MNEMONIC")
-    return Account.from_mnemonic(mnemonic, account_path=account_path)
+    return default_account_pool()[n]
 
 
 def derive_random_account():
-    return derive_new_account(secrets.randbelow(10000) + 1)
+    # draw from the upper half of the soft indexes,
+    # away from the fixed indexes used by the tests
+    return derive_new_account(2**30 + secrets.randbelow(2**30))
 
 
 def edit_ini_sections(chain_id, ini_path, callback):
@@ -847,6 +1372,32 @@ def adjust_base_fee(parent_fee, gas_limit, gas_used, params):
         return parent_fee + max(delta, 1)
 
 
+def next_base_fee(parent_fee, gas_limit, gas_used, params):
+    "same as adjust_base_fee, in integer wei to stay exact with big fees"
+    return simulate_base_fees(parent_fee, [gas_limit], [gas_used], params)[0]
+
+
+def simulate_base_fees(base_fee, gas_limits, gas_used, params):
+    """
+    the series of base fees following each block of the gas limits and gas used
+    series, starting from the base fee of the first block, with the decrease
+    bounded by the min_gas_price of the feemarket params.
+    """
+    change_denominator = int(params.get("base_fee_change_denominator", 8))
+    elasticity_multiplier = int(params.get("elasticity_multiplier", 2))
+    min_gas_price = int(Decimal(params.get("min_gas_price", 0)) * WEI_PER_UOM)
+    fees = []
+    for gas_limit, used in zip(gas_limits, gas_used):
+        gas_target = gas_limit // elasticity_multiplier
+        delta = base_fee * abs(gas_target - used) // gas_target // change_denominator
+        if gas_target > used:
+            base_fee = max(base_fee - delta, min_gas_price)
+        elif gas_target < used:
+            base_fee += max(delta, 1)
+        fees.append(base_fee)
+    return fees
+
+
 def assert_duplicate(rpc, height):
     res = requests.get(f"{rpc}/block_results?height={height}").json().get("result")
     res = next((tx for tx in res.get("txs_results") if tx["code"] == 0), None)
@@ -932,20 +1483,21 @@ def parse_events_rpc(events):
 async def assert_create_erc20_denom(w3, signer):
     await ensure_create2_deployed(w3, signer)
     await ensure_deployed_by_create2(
-        w3, signer, get_initcode(WETH9_ARTIFACT), salt=WETH_SALT
+        w3, signer, get_initcode(weth9_artifact()), salt=WETH_SALT
     )
-    assert (await ERC20.fns.decimals().call(w3, to=WETH_ADDRESS)) == 18
-    total = await ERC20.fns.totalSupply().call(w3, to=WETH_ADDRESS)
-    signer1_balance_eth_bf = await ERC20.fns.balanceOf(signer).call(w3, to=WETH_ADDRESS)
+    weth_addr = weth_address()
+    assert (await ERC20.fns.decimals().call(w3, to=weth_addr)) == 18
+    total = await ERC20.fns.totalSupply().call(w3, to=weth_addr)
+    signer1_balance_eth_bf = await ERC20.fns.balanceOf(signer).call(w3, to=weth_addr)
     assert total == signer1_balance_eth_bf == 0
 
-    weth = WETH(to=WETH_ADDRESS)
-    erc20_denom = f"erc20:{WETH_ADDRESS}"
+    weth = WETH(to=weth_addr)
+    erc20_denom = f"erc20:{weth_addr}"
     deposit_amt = 100
     res = await weth.fns.deposit().transact(w3, signer, value=deposit_amt)
     assert res.status == 1
-    total = await ERC20.fns.totalSupply().call(w3, to=WETH_ADDRESS)
-    signer1_balance_eth = await ERC20.fns.balanceOf(signer).call(w3, to=WETH_ADDRESS)
+    total = await ERC20.fns.totalSupply().call(w3, to=weth_addr)
+    signer1_balance_eth = await ERC20.fns.balanceOf(signer).call(w3, to=weth_addr)
     assert total == signer1_balance_eth == deposit_amt
     signer1_balance_eth_bf = signer1_balance_eth
     return erc20_denom, total
@@ -971,17 +1523,28 @@ def assert_register_erc20_denom(c, addr, tmp_path):
 
 async def assert_weth_flow(w3, weth_addr, owner, account):
     weth = WETH(to=weth_addr)
-    before = await balance_of(w3, ZERO_ADDRESS, owner)
+    balances = [
+        (MULTICALL3_ADDRESS, MULTICALL3.fns.getEthBalance(owner)),
+        (weth_addr, ERC20.fns.balanceOf(owner)),
+    ]
+    before, weth_before = await batch_call(w3, balances)
     receipt = await weth.fns.deposit().transact(w3, account, value=1000)
     fee = receipt["effectiveGasPrice"] * receipt["gasUsed"]
-    await balance_of(w3, weth_addr, owner) == 1000
+    assert await balance_of(w3, weth_addr, owner) == weth_before + 1000
     receipt = await weth.fns.withdraw(1000).transact(w3, account)
     fee += receipt["effectiveGasPrice"] * receipt["gasUsed"]
-    await balance_of(w3, weth_addr, owner) == 0
-    assert await balance_of(w3, ZERO_ADDRESS, owner) == before - fee
-    assert await weth.fns.decimals().call(w3) == 18
-    assert await weth.fns.symbol().call(w3) == "WETH"
-    assert await weth.fns.name().call(w3) == "Wrapped Ether"
+    calls = balances + [
+        (weth_addr, ERC20.fns.decimals()),
+        (weth_addr, ERC20.fns.symbol()),
+        (weth_addr, ERC20.fns.name()),
+    ]
+    assert await batch_call(w3, calls, block_identifier=receipt["blockNumber"]) == [
+        before - fee,
+        weth_before,
+        18,
+        "WETH",
+        "Wrapped Ether",
+    ]
 
 
 def address_to_bytes32(addr) -> HexBytes:
@@ -989,21 +1552,20 @@ def address_to_bytes32(addr) -> HexBytes:
 
 
 async def assert_tf_flow(w3, receiver, signer1, signer2, tf_erc20_addr):
+    owners = [signer1, signer2, receiver]
     # signer1 transfer 5tf_erc20 to receiver
     transfer_amt = 5
-    signer1_balance_bf = await ERC20.fns.balanceOf(signer1).call(w3, to=tf_erc20_addr)
-    signer2_balance_bf = await ERC20.fns.balanceOf(signer2).call(w3, to=tf_erc20_addr)
-    receiver_balance_bf = await ERC20.fns.balanceOf(receiver).call(w3, to=tf_erc20_addr)
-    await ERC20.fns.transfer(receiver, transfer_amt).transact(
+    signer1_bf, signer2_bf, receiver_bf = await erc20_balances(
+        w3, tf_erc20_addr, owners
+    )
+    receipt = await ERC20.fns.transfer(receiver, transfer_amt).transact(
         w3, signer1, to=tf_erc20_addr, gasPrice=(await w3.eth.gas_price)
     )
-    signer1_balance = await ERC20.fns.balanceOf(signer1).call(w3, to=tf_erc20_addr)
-    assert signer1_balance == signer1_balance_bf - transfer_amt
-    signer1_balance_bf = signer1_balance
-
-    receiver_balance = await ERC20.fns.balanceOf(receiver).call(w3, to=tf_erc20_addr)
-    assert receiver_balance == receiver_balance_bf + transfer_amt
-    receiver_balance_bf = receiver_balance
+    assert await erc20_balances(
+        w3, tf_erc20_addr, owners, block_identifier=receipt["blockNumber"]
+    ) == [signer1_bf - transfer_amt, signer2_bf, receiver_bf + transfer_amt]
+    signer1_bf -= transfer_amt
+    receiver_bf += transfer_amt
 
     # signer1 approve 2tf_erc20 to signer2
     approve_amt = 2
@@ -1014,15 +1576,9 @@ async def assert_tf_flow(w3, receiver, signer1, signer2, tf_erc20_addr):
     assert allowance == approve_amt
 
     # transferFrom signer1 to receiver via signer2 with 2tf_erc20
-    await ERC20.fns.transferFrom(signer1, receiver, approve_amt).transact(
+    receipt = await ERC20.fns.transferFrom(signer1, receiver, approve_amt).transact(
         w3, signer2, to=tf_erc20_addr, gasPrice=(await w3.eth.gas_price)
     )
-    signer1_balance = await ERC20.fns.balanceOf(signer1).call(w3, to=tf_erc20_addr)
-    assert signer1_balance == signer1_balance_bf - approve_amt
-    signer1_balance_bf = signer1_balance
-
-    signer2_balance = await ERC20.fns.balanceOf(signer2).call(w3, to=tf_erc20_addr)
-    assert signer2_balance == signer2_balance_bf
-    receiver_balance = await ERC20.fns.balanceOf(receiver).call(w3, to=tf_erc20_addr)
-    assert receiver_balance == receiver_balance_bf + approve_amt
-    receiver_balance_bf = receiver_balance
+    assert await erc20_balances(
+        w3, tf_erc20_addr, owners, block_identifier=receipt["blockNumber"]
+    ) == [signer1_bf - approve_amt, signer2_bf, receiver_bf + approve_amt]
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+
+import websockets
+
+# key of the arrival times recorded per subscription type
+SUBSCRIPTION_KEYS = {
+    "newHeads": lambda result: int(result["number"], 0),
+    "logs": lambda result: int(result["blockNumber"], 0),
+    "newPendingTransactions": lambda result: result,
+}
+
+
+class SubscriptionCounter:
+    """
+    streaming count of the messages of a subscription, only the first arrival
+    (wall clock) per block, or per tx hash for pending txs, is kept.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.arrivals = {}
+        self._key = SUBSCRIPTION_KEYS[kind]
+
+    def add(self, result, now):
+        self.count += 1
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.arrivals.setdefault(self._key(result), now)
+
+    def rate(self):
+        "messages per second between the first and the last arrival"
+        if self.count < 2 or self.last == self.first:
+            return None
+        return (self.count - 1) / (self.last - self.first)
+
+    def latencies(self, origins):
+        "arrival time since the origin (block time or submit time) of each key"
+        return [
+            now - origins[key] for key, now in self.arrivals.items() if key in origins
+        ]
+
+
+class Client:
+    def __init__(self, ws, delay=0):
+        self._ws = ws
+        self._gen_id = 0
+        self._subs = defaultdict(asyncio.Queue)
+        self._rsps = defaultdict(asyncio.Queue)
+        self._counters = {}
+        # simulate a slow consumer by sleeping on each received message
+        self.delay = delay
+        self.closed = None
+
+    def gen_id(self):
+        self._gen_id += 1
+        return self._gen_id
+
+    async def receive_loop(self):
+        while True:
+            try:
+                msg = json.loads(await self._ws.recv())
+            except websockets.ConnectionClosed as e:
+                self.closed = e
+                return
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if "id" in msg:
+                # responses
+                await self._rsps[msg["id"]].put(msg)
+            else:
+                # subscriptions
+                assert msg["method"] == "eth_subscription"
+                sub_id = msg["params"]["subscription"]
+                counter = self._counters.get(sub_id)
+                if counter is not None:
+                    counter.add(msg["params"]["result"], time.time())
+                else:
+                    await self._subs[sub_id].put(msg["params"]["result"])
+
+    async def recv_response(self, rpcid):
+        rsp = await self._rsps[rpcid].get()
+        del self._rsps[rpcid]
+        return rsp
+
+    async def recv_subscription(self, sub_id):
+        return await self._subs[sub_id].get()
+
+    async def subscribe(self, *args):
+        rpcid = self.gen_id()
+        await self._ws.send(
+            json.dumps({"id": rpcid, "method": "eth_subscribe", "params": args})
+        )
+        rsp = await self.recv_response(rpcid)
+        assert "error" not in rsp
+        return rsp["result"]
+
+    async def subscribe_counter(self, kind, *args):
+        """
+        subscribe and count the messages as they arrive instead of queueing
+        them, return the subscription id and the counter.
+        """
+        sub_id = await self.subscribe(kind, *args)
+        counter = self._counters[sub_id] = SubscriptionCounter(kind)
+        # messages received before the counter is registered
+        queue = self._subs.pop(sub_id, None)
+        while queue is not None and not queue.empty():
+            counter.add(queue.get_nowait(), time.time())
+        return sub_id, counter
+
+    def sub_qsize(self, sub_id):
+        return self._subs[sub_id].qsize()
+
+    async def unsubscribe(self, sub_id):
+        rpcid = self.gen_id()
+        await self._ws.send(
+            json.dumps({"id": rpcid, "method": "eth_unsubscribe", "params": [sub_id]})
+        )
+        rsp = await self.recv_response(rpcid)
+        assert "error" not in rsp
+        self._counters.pop(sub_id, None)
+        return rsp["result"]